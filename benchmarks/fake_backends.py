@@ -0,0 +1,307 @@
+"""In-memory stand-ins for gspread and pyrogram used by the offline benchmarks.
+
+The fakes only implement what bot.py calls. Every Sheets and Drive request is
+counted per worksheet and method, can be slowed down by a fixed latency, and
+fails with a 429 APIError once the per-minute quota is used up, like the real
+API does.
+"""
+import threading
+import time
+from collections import Counter, deque
+from io import BytesIO
+from itertools import count
+
+from gspread.exceptions import APIError
+from gspread.utils import a1_to_rowcol
+from PIL import Image
+
+
+class FakeResponse:
+    """Just enough of a requests.Response for gspread's APIError and the club scraper."""
+
+    def __init__(self, status_code, payload=None, content=b"", headers=None):
+        self.status_code = status_code
+        self.payload = payload or {}
+        self.content = content
+        self.text = content.decode("utf-8", "replace")
+        self.headers = headers or {}
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class ApiRecorder:
+    """Counts calls per (target, method) and applies latency and a per-minute Sheets quota.
+
+    Calls to the "http" and "telegram" targets use network_latency and do not count
+    towards the quota; everything else is a Sheets or Drive call.
+    """
+
+    NETWORK_TARGETS = ("http", "telegram")
+
+    def __init__(self, latency=0.0, quota_per_minute=None, network_latency=0.0):
+        self.latency = latency
+        self.network_latency = network_latency
+        self.quota_per_minute = quota_per_minute
+        self.calls = Counter()
+        self.recent = deque()
+        self.lock = threading.Lock()
+
+    def record(self, target, method):
+        is_sheets = target not in self.NETWORK_TARGETS
+        with self.lock:
+            if is_sheets:
+                now = time.monotonic()
+                while self.recent and now - self.recent[0] > 60:
+                    self.recent.popleft()
+                if self.quota_per_minute is not None and len(self.recent) >= self.quota_per_minute:
+                    raise APIError(
+                        FakeResponse(
+                            429,
+                            {"error": {"code": 429, "message": "Quota exceeded", "status": "RESOURCE_EXHAUSTED"}},
+                        )
+                    )
+                self.recent.append(now)
+            self.calls[(target, method)] += 1
+        latency = self.latency if is_sheets else self.network_latency
+        if latency:
+            time.sleep(latency)
+
+    def reset(self):
+        with self.lock:
+            self.calls.clear()
+
+    def total(self):
+        with self.lock:
+            return sum(self.calls.values())
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.calls)
+
+
+def numericise(value):
+    """Mimic gspread's get_all_records, which turns digit strings into numbers."""
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return value
+
+
+class FakeWorksheet:
+    def __init__(self, recorder, title, rows):
+        self.recorder = recorder
+        self.title = title
+        self.rows = [list(row) for row in rows]
+        self.spreadsheet = None
+
+    def _record(self, method):
+        self.recorder.record(self.title, method)
+
+    def get_all_values(self):
+        self._record("get_all_values")
+        return [list(row) for row in self.rows]
+
+    def get_all_records(self, expected_headers=None):
+        self._record("get_all_records")
+        headers = self.rows[0]
+        return [
+            {header: numericise(row[index] if index < len(row) else "") for index, header in enumerate(headers)}
+            for row in self.rows[1:]
+        ]
+
+    def col_values(self, col):
+        self._record("col_values")
+        values = [row[col - 1] if len(row) >= col else "" for row in self.rows]
+        while values and values[-1] == "":
+            values.pop()
+        return values
+
+    def batch_update(self, data, **kwargs):
+        self._record("batch_update")
+        for update in data:
+            row, col = a1_to_rowcol(update["range"])
+            self.set_cell(row, col, update["values"][0][0])
+
+    def set_cell(self, row, col, value):
+        while len(self.rows) < row:
+            self.rows.append([])
+        cells = self.rows[row - 1]
+        while len(cells) < col:
+            cells.append("")
+        cells[col - 1] = value
+
+
+class FakeSpreadsheet:
+    ids = count(1)
+
+    def __init__(self, recorder, title, worksheets):
+        self.recorder = recorder
+        self.title = title
+        self.id = f"fake-spreadsheet-{next(self.ids)}"
+        self.modified_time = "2024-08-01T00:00:00.000Z"
+        self.worksheet_list = worksheets
+        for worksheet in worksheets:
+            worksheet.spreadsheet = self
+
+    def worksheets(self):
+        self.recorder.record(self.title, "worksheets")
+        return list(self.worksheet_list)
+
+    @property
+    def sheet1(self):
+        return self.worksheet_list[0]
+
+    def values_batch_get(self, ranges, params=None):
+        self.recorder.record(self.title, "values_batch_get")
+        by_title = {worksheet.title: worksheet for worksheet in self.worksheet_list}
+        return {
+            "valueRanges": [
+                {"range": name, "values": [list(row) for row in by_title[name.strip("'")].rows]}
+                for name in ranges
+            ]
+        }
+
+
+class FakeGspreadClient:
+    """Serves open() from the fake spreadsheets and answers Drive modifiedTime lookups."""
+
+    def __init__(self, recorder, spreadsheets):
+        self.recorder = recorder
+        self.spreadsheets = {spreadsheet.title: spreadsheet for spreadsheet in spreadsheets}
+
+    def open(self, title, folder_id=None):
+        self.recorder.record(title, "open")
+        return self.spreadsheets[title]
+
+    def get_file_drive_metadata(self, id):
+        self.recorder.record("drive", "get")
+        for spreadsheet in self.spreadsheets.values():
+            if spreadsheet.id == id:
+                return {"id": id, "name": spreadsheet.title, "modifiedTime": spreadsheet.modified_time}
+        raise KeyError(id)
+
+
+class FakeHttp:
+    """Replaces conditional_get: serves one club page layout and a PNG icon for every URL."""
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        buffer = BytesIO()
+        Image.new("RGB", (8, 8), (200, 30, 30)).save(buffer, format="PNG")
+        self.icon = buffer.getvalue()
+
+    def page(self, url):
+        return (
+            '<html><body><img loading="lazy" src="/icons/logo.png">'
+            '<div class="field_body"><h2>About Us</h2><p>We are a club.</p><p>Join us.</p></div>'
+            '<div class="field_body"><h2>Key Events</h2><ul><li><u>Welcome Tea</u></li>'
+            "<li><u>Cultural Night</u></li></ul></div></body></html>"
+        ).encode("utf-8")
+
+    def get(self, url, etag=None, last_modified=None):
+        self.recorder.record("http", "get")
+        if etag == "v1":
+            return FakeResponse(304, headers={"ETag": "v1"})
+        content = self.icon if url.endswith(".png") else self.page(url)
+        return FakeResponse(200, content=content, headers={"ETag": "v1"})
+
+
+class FakeUser:
+    def __init__(self, id, username):
+        self.id = id
+        self.username = username
+
+
+class FakeChat:
+    """A chat remembers its newest screen so flows can press the buttons the bot just showed."""
+
+    def __init__(self, id):
+        self.id = id
+        self.last_message = None
+
+
+class FakeMedia:
+    ids = count(1)
+
+    def __init__(self):
+        self.file_id = f"fake-file-{next(self.ids)}"
+
+
+class FakeMessage:
+    """Records every outgoing Telegram call made through it, and through the messages it sends."""
+
+    ids = count(1)
+
+    def __init__(self, recorder, chat, user=None, text=None, reply_markup=None):
+        self.recorder = recorder
+        self.id = next(self.ids)
+        self.chat = chat
+        self.from_user = user
+        self.text = text
+        self.reply_markup = reply_markup
+        self.document = None
+        self.photo = None
+
+    def _sent(self, method, text=None, reply_markup=None):
+        self.recorder.record("telegram", method)
+        sent = FakeMessage(self.recorder, self.chat, text=text, reply_markup=reply_markup)
+        self.chat.last_message = sent
+        return sent
+
+    async def reply_text(self, text, **kwargs):
+        return self._sent("send_message", text, kwargs.get("reply_markup"))
+
+    async def reply(self, text, **kwargs):
+        return self._sent("send_message", text, kwargs.get("reply_markup"))
+
+    async def edit_text(self, text, **kwargs):
+        self.recorder.record("telegram", "edit_message_text")
+        self.text = text
+        self.reply_markup = kwargs.get("reply_markup")
+        self.chat.last_message = self
+        return self
+
+    async def edit_reply_markup(self, reply_markup=None):
+        self.recorder.record("telegram", "edit_message_reply_markup")
+        self.reply_markup = reply_markup
+        self.chat.last_message = self
+        return self
+
+    async def delete(self):
+        self.recorder.record("telegram", "delete_messages")
+
+    async def reply_document(self, document, **kwargs):
+        sent = self._sent("send_document", kwargs.get("caption"), kwargs.get("reply_markup"))
+        sent.document = FakeMedia()
+        return sent
+
+    async def reply_photo(self, photo, **kwargs):
+        sent = self._sent("send_photo", kwargs.get("caption"), kwargs.get("reply_markup"))
+        sent.photo = FakeMedia()
+        return sent
+
+    def button_data(self):
+        """Return the callback_data of every inline button on this message, top to bottom."""
+        if self.reply_markup is None:
+            return []
+        return [
+            button.callback_data
+            for row in self.reply_markup.inline_keyboard
+            for button in row
+            if button.callback_data
+        ]
+
+
+class FakeCallbackQuery:
+    def __init__(self, recorder, user, data, message):
+        self.recorder = recorder
+        self.from_user = user
+        self.data = data
+        self.message = message
+
+    async def answer(self, *args, **kwargs):
+        self.recorder.record("telegram", "answer_callback_query")
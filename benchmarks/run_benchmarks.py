@@ -0,0 +1,323 @@
+"""Offline benchmarks for the bot's hot paths.
+
+Runs login, a 50-ID late sign-in, the bookings drill-down, camp strength and a
+club view against the in-memory backends in fake_backends.py, and reports
+latency and the number of Sheets, HTTP and Telegram calls per action:
+
+    python benchmarks/run_benchmarks.py --latency 0.05 --iterations 20 --check
+
+With --check the run fails if any flow makes more steady-state Sheets calls
+than CALL_BUDGETS allows, so a change that adds round trips is caught before
+camp rather than during it. Every run first checks the inline query answers in
+INLINE_CASES and fails if any differ.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from fake_backends import (
+    ApiRecorder,
+    FakeCallbackQuery,
+    FakeChat,
+    FakeGspreadClient,
+    FakeHttp,
+    FakeMessage,
+    FakeSpreadsheet,
+    FakeUser,
+    FakeWorksheet,
+)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SUBCLANS = [f"{clan}{number}" for clan in "DOMQ" for number in range(1, 7)]
+MASTERLIST_SIZE = 800
+LATE_SIGN_IN_IDS = 50
+
+# Most Sheets and Drive calls each flow may make once its caches are warm
+CALL_BUDGETS = {
+    "login": 0,
+    "late_sign_in_50": 4,
+    "bookings_drill_down": 1,
+    "show_strength": 0,
+    "club_view": 0,
+}
+
+# Result ids an OC member must get for each inline query; D1 to D6 are subclans, so "d3" never means Day 3
+INLINE_CASES = {
+    "points": [f"points:{subclan}" for subclan in sorted(SUBCLANS)],
+    "points D3": ["points:D3"],
+    "credits d3": ["credits:D3"],
+    "d3": ["points:D3", "credits:D3", "schedule:D3:Day 1", "schedule:D3:Day 3"],
+    "schedule D3": ["schedule:D3:Day 1", "schedule:D3:Day 3"],
+    "schedule d3 day 3": ["schedule:D3:Day 3"],
+    "day 3 credits q1": ["credits:Q1"],
+}
+
+
+def student_id(index):
+    return f"0{1000000 + index:07d}"
+
+
+def build_spreadsheets(recorder):
+    """Create the four camp spreadsheets with realistic sizes."""
+    masterlist = [["Student ID", "Matriculated Name", "Telegram Username", "Role", "SUBCLAN"]]
+    for index in range(MASTERLIST_SIZE):
+        role = "OC" if index < 10 else ("Facilitator" if index < 100 else "Freshmen")
+        masterlist.append(
+            [student_id(index), f"Participant {index}", f"@user{index}", role, SUBCLANS[index % len(SUBCLANS)]]
+        )
+    registration = [["No.", "Student ID"]] + [[str(index), student_id(index)] for index in range(1, 300)]
+    check_out = [["No.", "Student ID"]]
+    strength = [["Subclan", "Present", "Total"]] + [["OC", "10", "10"], ["GM", "5", "6"], ["CH", "4", "4"], ["MC", "2", "2"]]
+    strength += [[subclan, "20", "33"] for subclan in SUBCLANS]
+
+    points = [["Subclan"] + [f"Game {game}" for game in range(1, 9)] + ["Total"]]
+    points += [[subclan] + ["10"] * 8 + ["80"] for subclan in SUBCLANS]
+    credits = [["Subclan"] + [f"Round {game}" for game in range(1, 7)] + ["Credits"]]
+    credits += [[subclan] + ["5"] * 6 + ["30"] for subclan in SUBCLANS]
+
+    venue = [["Facility", "Facility Type", "Booking Date", "Booking Start Time", "Booking End Time", "BookingStatus", "Booking Reference Number"]]
+    for index in range(600):
+        venue.append(
+            [
+                f"Room {index % 40}",
+                ["Seminar Room", "Study Room", "Hall"][index % 3],
+                f"{5 + index % 10:02d}-Aug-2024",
+                "09:00",
+                "12:00",
+                "Confirmed" if index % 5 else "Cancelled",
+                f"REF{index:05d}",
+            ]
+        )
+    contacts = [["Name", "Position", "Telegram"]]
+    contacts += [[f"Contact {index}", position, f"@contact{index}"] for index, position in enumerate(["Co-chair", "HR", "Programmes", "Operations", "Logistics"] * 3)]
+
+    return [
+        FakeSpreadsheet(
+            recorder,
+            "[Day 1 MASTERLIST] Registration List",
+            [
+                FakeWorksheet(recorder, "Registration", registration),
+                FakeWorksheet(recorder, "Check Out & In", check_out),
+                FakeWorksheet(recorder, "Masterlist", masterlist),
+                FakeWorksheet(recorder, "Camp Strength", strength),
+            ],
+        ),
+        FakeSpreadsheet(
+            recorder,
+            "[ACTUAL CAMP] Score Sheet",
+            [
+                FakeWorksheet(recorder, "Final Points", points),
+                FakeWorksheet(recorder, "Overall Day 3 Results", credits),
+            ],
+        ),
+        FakeSpreadsheet(recorder, "Important Contacts", [FakeWorksheet(recorder, "Sheet1", contacts)]),
+        FakeSpreadsheet(
+            recorder,
+            "Facilities Booking for ICON Camp 2024",
+            [FakeWorksheet(recorder, "Updated 30 July", venue)],
+        ),
+    ]
+
+
+def write_fixtures(directory):
+    """Create the local files the bot reads relative to its working directory."""
+    for folder in ("misc", "movement", "clubs", "clan", "booklet"):
+        os.makedirs(os.path.join(directory, folder), exist_ok=True)
+    with open(os.path.join(directory, "misc", "storyline.txt"), "w", encoding="utf-8") as file:
+        file.write("The Island of Chronosia awaits.")
+    for day in (1, 3):
+        with open(os.path.join(directory, "movement", f"all_subclans_schedule_d{day}.txt"), "w", encoding="utf-8") as file:
+            for subclan in SUBCLANS:
+                file.write(f"Schedule for {subclan}:\n9:00 AM - Station 1\n*Bring water\n10:00 AM - Station 2\n")
+
+
+def load_bot(recorder, quota=None):
+    """Import bot.py against the fake backends without connecting to Google or Telegram.
+
+    The bot's Sheets rate limiter is sized to the fake quota, or effectively unlimited without one.
+    """
+    sys.path.insert(0, REPO_ROOT)
+    import bot
+
+    bot.gspread_client = FakeGspreadClient(recorder, build_spreadsheets(recorder))
+    bot.conditional_get = FakeHttp(recorder).get
+    bot.sheets_rate_limiter = bot.SheetsRateLimiter(quota or 1_000_000, bot.SHEETS_BURST)
+    threading.Thread(target=bot.attendance_writer, name="attendance-writer", daemon=True).start()
+    return bot
+
+
+def warm_up(bot):
+    """Load the caches the way the startup warm-up does, without starting background refreshers."""
+    bot.load_schedules()
+    bot.refresh_masterlist_index()
+    bot.get_scoreboard()
+    bot.get_camp_strength()
+    bot.prefetch_club_info()
+
+
+def log_in(bot, index):
+    """Create a session directly so flows that are not about login skip it."""
+    record = bot.masterlist_by_id[student_id(index)]
+    user = FakeUser(10_000 + index, record["Telegram Username"][1:])
+    bot.user_sessions[user.id] = {
+        "username": user.username,
+        "role": record["Role"],
+        "subclan": record["SUBCLAN"],
+    }
+    return user
+
+
+async def press(bot, recorder, user, chat, data):
+    """Press an inline button on the chat's newest screen."""
+    message = chat.last_message or FakeMessage(recorder, chat, user)
+    await bot.handle_callback_query(bot.app, FakeCallbackQuery(recorder, user, data, message))
+
+
+def check_inline_queries(bot):
+    """Return the queries in INLINE_CASES whose results differ from the expected ones."""
+    session = {"role": "OC", "subclan": None}
+    return [
+        query
+        for query, expected in INLINE_CASES.items()
+        if [result.id for result in bot.build_inline_results(query, session)] != expected
+    ]
+
+
+async def flow_login(bot, recorder, iteration):
+    index = 200 + iteration
+    user = FakeUser(20_000 + iteration, f"user{index}")
+    chat = FakeChat(user.id)
+    await press(bot, recorder, user, chat, "login")
+    await press(bot, recorder, user, chat, "begin_adventure")
+
+
+async def flow_late_sign_in(bot, recorder, iteration):
+    user = log_in(bot, 0)
+    chat = FakeChat(user.id)
+    first = 400 + iteration * LATE_SIGN_IN_IDS
+    ids = [student_id(first + offset) for offset in range(LATE_SIGN_IN_IDS)]
+    bot.user_states[user.id] = "late_sign_in"
+    await bot.handle_client_input(bot.app, FakeMessage(recorder, chat, user, " ".join(ids)))
+
+
+async def flow_bookings(bot, recorder, iteration):
+    user = log_in(bot, 1)
+    chat = FakeChat(user.id)
+    await press(bot, recorder, user, chat, "view_bookings")
+    # Month, then date, then facility type: always take the first button
+    for _ in range(3):
+        await press(bot, recorder, user, chat, chat.last_message.button_data()[0])
+
+
+async def flow_strength(bot, recorder, iteration):
+    user = log_in(bot, 2)
+    await press(bot, recorder, user, FakeChat(user.id), "show_strength")
+
+
+async def flow_club(bot, recorder, iteration):
+    user = log_in(bot, 3)
+    chat = FakeChat(user.id)
+    await press(bot, recorder, user, chat, "explore_clubs")
+    clubs = chat.last_message.button_data()
+    await press(bot, recorder, user, chat, clubs[iteration % (len(clubs) - 1)])
+
+
+FLOWS = {
+    "login": flow_login,
+    "late_sign_in_50": flow_late_sign_in,
+    "bookings_drill_down": flow_bookings,
+    "show_strength": flow_strength,
+    "club_view": flow_club,
+}
+
+
+def split_calls(calls):
+    """Group a call snapshot into (sheets and drive, http, telegram) totals."""
+    sheets = sum(number for (target, _), number in calls.items() if target not in ApiRecorder.NETWORK_TARGETS)
+    http = sum(number for (target, _), number in calls.items() if target == "http")
+    telegram = sum(number for (target, _), number in calls.items() if target == "telegram")
+    return sheets, http, telegram
+
+
+async def run_flow(bot, recorder, name, flow, iterations):
+    latencies = []
+    sheet_calls = []
+    other_calls = []
+    for iteration in range(iterations):
+        recorder.reset()
+        started = time.perf_counter()
+        await flow(bot, recorder, iteration)
+        latencies.append((time.perf_counter() - started) * 1000)
+        # Attendance is written in the background; count its calls against the flow that caused them
+        while bot.count_pending_attendance():
+            await asyncio.sleep(0.005)
+        sheets, http, telegram = split_calls(recorder.snapshot())
+        sheet_calls.append(sheets)
+        other_calls.append((http, telegram))
+    return {
+        "name": name,
+        "p50": statistics.median(latencies),
+        "p95": sorted(latencies)[max(0, int(len(latencies) * 0.95) - 1)],
+        "first_sheet_calls": sheet_calls[0],
+        "steady_sheet_calls": max(sheet_calls[1:] or sheet_calls),
+        "http_calls": max(http for http, _ in other_calls),
+        "telegram_calls": max(telegram for _, telegram in other_calls),
+    }
+
+
+async def run_all(bot, recorder, iterations, selected):
+    bot.event_loop = asyncio.get_running_loop()
+    return [await run_flow(bot, recorder, name, FLOWS[name], iterations) for name in selected]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every fake Sheets call")
+    parser.add_argument("--network-latency", type=float, default=0.0, help="seconds added to every fake Telegram and HTTP call")
+    parser.add_argument("--quota", type=int, default=None, help="fake Sheets requests allowed per minute")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--flow", action="append", choices=sorted(FLOWS), help="run only these flows")
+    parser.add_argument("--check", action="store_true", help="fail if a flow exceeds its Sheets call budget")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="icon-bench-")
+    write_fixtures(workdir)
+    os.chdir(workdir)
+    os.environ["SESSION_DB_PATH"] = os.path.join(workdir, "bot_state.db")
+
+    recorder = ApiRecorder(latency=0, quota_per_minute=args.quota)
+    bot = load_bot(recorder, args.quota)
+    warm_up(bot)
+    wrong_inline = check_inline_queries(bot)
+    if wrong_inline:
+        print(f"Wrong inline query results: {', '.join(repr(query) for query in wrong_inline)}")
+        sys.exit(1)
+    recorder.latency = args.latency
+    recorder.network_latency = args.network_latency
+
+    results = asyncio.run(run_all(bot, recorder, args.iterations, args.flow or list(FLOWS)))
+
+    print(f"{'flow':<22}{'p50 ms':>9}{'p95 ms':>9}{'sheets 1st':>12}{'sheets':>8}{'http':>6}{'telegram':>10}")
+    over_budget = []
+    for result in results:
+        print(
+            f"{result['name']:<22}{result['p50']:>9.1f}{result['p95']:>9.1f}"
+            f"{result['first_sheet_calls']:>12}{result['steady_sheet_calls']:>8}"
+            f"{result['http_calls']:>6}{result['telegram_calls']:>10}"
+        )
+        if result["steady_sheet_calls"] > CALL_BUDGETS[result["name"]]:
+            over_budget.append(result["name"])
+
+    if args.check and over_budget:
+        print(f"Over the Sheets call budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,44 @@
 import os
+import json
+import asyncio
 import time
+import hashlib
 import gspread
+from gspread.exceptions import APIError
+from gspread.utils import rowcol_to_a1
 from datetime import datetime
 from oauth2client.service_account import ServiceAccountCredentials
-from pyrogram import Client, filters
+from pyrogram import Client, filters, idle
+from pyrogram.errors import BadRequest, FloodWait, MessageNotModified, RPCError
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from pyrogram.types import ReplyKeyboardMarkup, KeyboardButton
+from pyrogram.types import InlineQueryResultArticle, InputTextMessageContent
 from bs4 import BeautifulSoup
 import requests
+from urllib.parse import urlparse
 from PIL import Image
 from io import BytesIO
+import io
+import csv
+import zipfile
+from xml.etree import ElementTree
 from dotenv import load_dotenv
-from collections import defaultdict
+from itertools import count
+from collections import OrderedDict, defaultdict, deque
+from collections.abc import MutableMapping
+from contextlib import contextmanager
 from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import queue
+import sqlite3
+import heapq
+import subprocess
+import sys
+import re
+import random
+import secrets
+import contextvars
+import threading
 import emoji
 
 # Load environment variables
@@ -28,40 +54,218 @@ scope = [
     "https://spreadsheets.google.com/feeds",
     "https://www.googleapis.com/auth/drive",
 ]
-creds = ServiceAccountCredentials.from_json_keyfile_name(json_cred, scope)
-client = gspread.authorize(creds)
-registration_sheet = client.open("[Day 1 MASTERLIST] Registration List").worksheet(
-    "Registration"
-)
-late_early_sheet = client.open("[Day 1 MASTERLIST] Registration List").worksheet(
-    "Check Out & In"
-)
-masterlist_sheet = client.open("[Day 1 MASTERLIST] Registration List").worksheet("Masterlist")
-score_sheet = client.open("[ACTUAL CAMP] Score Sheet").worksheet("Final Points")
-contact_sheet = client.open("Important Contacts")
-venue_sheet = client.open(
-    "Facilities Booking for ICON Camp 2024"
-).worksheet("Updated 30 July")
-total_strength_sheet = client.open("[Day 1 MASTERLIST] Registration List").worksheet(
-    "Camp Strength"
-)
-bidding_sheet = client.open("[ACTUAL CAMP] Score Sheet").worksheet("Overall Day 3 Results")
+
+# Each spreadsheet is opened once, and every worksheet handle comes from that single open
+SPREADSHEET_NAMES = {
+    "registration": "[Day 1 MASTERLIST] Registration List",
+    "score": "[ACTUAL CAMP] Score Sheet",
+    "contacts": "Important Contacts",
+    "venue": "Facilities Booking for ICON Camp 2024",
+}
+WORKSHEET_TITLES = {
+    "registration": ("registration", "Registration"),
+    "late_early": ("registration", "Check Out & In"),
+    "masterlist": ("registration", "Masterlist"),
+    "total_strength": ("registration", "Camp Strength"),
+    "score": ("score", "Final Points"),
+    "bidding": ("score", "Overall Day 3 Results"),
+    "venue": ("venue", "Updated 30 July"),
+}
+
+gspread_client = None
+spreadsheets = {}  # spreadsheet key -> (Spreadsheet, {worksheet title: Worksheet})
+sheets_setup_lock = threading.Lock()
+spreadsheet_locks = {key: threading.Lock() for key in SPREADSHEET_NAMES}
+
+def get_gspread_client():
+    """Authorize gspread on first use."""
+    global gspread_client
+    with sheets_setup_lock:
+        if gspread_client is None:
+            creds = ServiceAccountCredentials.from_json_keyfile_name(json_cred, scope)
+            gspread_client = gspread.authorize(creds)
+        return gspread_client
+
+def open_spreadsheet(key):
+    """Open the spreadsheet and list its worksheets once, returning (Spreadsheet, worksheets by title)."""
+    if key in spreadsheets:
+        return spreadsheets[key]
+    with spreadsheet_locks[key]:
+        if key not in spreadsheets:
+            title = SPREADSHEET_NAMES[key]
+            spreadsheet = InstrumentedSheet(call_sheets_api(title, "open", get_gspread_client().open, title))
+            worksheets = {worksheet.title: InstrumentedSheet(worksheet) for worksheet in spreadsheet.worksheets()}
+            spreadsheets[key] = (spreadsheet, worksheets)
+        return spreadsheets[key]
+
+def get_spreadsheet(key):
+    return open_spreadsheet(key)[0]
+
+def get_worksheet(name):
+    """Return a worksheet handle, opening its spreadsheet on first use."""
+    spreadsheet_key, title = WORKSHEET_TITLES[name]
+    return open_spreadsheet(spreadsheet_key)[1][title]
 
 # Constants
 MAX_CAPTION_LENGTH = 1024
+MAX_MESSAGE_LENGTH = 4096
 MAX_ABOUT_US_LENGTH = 600  # Length limit for the About Us section
 BOOKINGS_PER_PAGE = 5
+CALLBACK_TOKEN_CAPACITY = 10000  # Booking buttons remembered before the least recently used expire
+EDIT_IN_PLACE = os.getenv("EDIT_IN_PLACE", "1") != "0"  # Menu buttons edit their message instead of sending a new one
+RENDERED_SCREEN_CAPACITY = 10000  # Messages whose shown screen is remembered to skip unchanged edits
+FAST_START = os.getenv("FAST_START", "1") != "0"  # Connect to Telegram before the Sheets caches are warm
+WORKER_COUNT = int(os.getenv("WORKER_COUNT", "1"))  # Bot processes splitting users between them
+WORKER_INDEX = int(os.getenv("WORKER_INDEX", "0"))  # This process's share of users; worker 0 also writes attendance and the shared cache files
+JOURNAL_POLL_INTERVAL = 1  # Seconds between journal checks when other workers add the entries
+ATTENDANCE_MAX_BATCH = 50  # Most journaled attendance submissions merged into one sheet write
+JOURNAL_RETRY_INTERVAL = 30  # Seconds before the first replay after a failed write, doubled on each further failure
+JOURNAL_RETRY_CAP = 300  # Longest wait in seconds between replays while Sheets keeps failing
+JOURNAL_MAX_ATTEMPTS = 10  # Writes refused with a non-transient error before an entry is given up and its submitter told
+SUBMITTED_AT_FORMAT = "%d %b %I:%M %p"  # How attendance times are written to the sheets
+IMPORT_MAX_BYTES = 5 * 1024 * 1024  # Largest attendance file accepted for import
+IMPORT_MAX_ROWS = 2000  # Most IDs accepted from one attendance file
+BROADCAST_WORKERS = 20  # Broadcast messages in flight at once; Telegram allows about 30 a second
+BROADCAST_PROGRESS_INTERVAL = 3  # Seconds between edits of a broadcast's progress message
+MASTERLIST_REFRESH_INTERVAL = 300  # Seconds between background Masterlist refreshes
+MASTERLIST_MISS_REFRESH_INTERVAL = 30  # Minimum seconds between refreshes triggered by unknown users
+SHEET_CHANGE_CHECK_INTERVAL = 60  # Seconds between Drive checks for edits to a cached sheet
+SCOREBOARD_REFRESH_INTERVAL = 30  # Seconds between background reloads of both score sheets
+INLINE_CACHE_TIME = SCOREBOARD_REFRESH_INTERVAL  # Seconds Telegram may reuse an inline answer; no staler than the scoreboard
+INLINE_MAX_RESULTS = 50  # Telegram accepts at most 50 results per inline answer
+STRENGTH_SYNC_INTERVAL = 120  # Seconds between checks of the local strength counts against the sheet
+CLUB_CACHE_PATH = "clubs/club_cache.json"
+CLUB_REQUEST_TIMEOUT = 10  # Seconds before a request to the club website is abandoned
+CLUB_PREFETCH_WORKERS = 4  # Concurrent club page downloads during prefetch
+CLUB_REFRESH_INTERVAL = 3600  # Seconds between background club page revalidations
+MEDIA_REGISTRY_PATH = "media_registry.json"  # Registry file of earlier versions, imported into the state database
+SCHEDULE_DIR = "movement"  # Holds one all_subclans_schedule_d<N>.txt per camp day
+SCHEDULE_RELOAD_INTERVAL = 30  # Seconds between checks of the schedule files for edits
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "bot_state.db")
+SESSION_TTL = 4 * 24 * 3600  # Seconds a login stays valid; longer than the whole camp
+STATE_TTL = 3600  # Seconds a pending input prompt is remembered
+SESSION_EVICT_INTERVAL = 600  # Seconds between sweeps for expired sessions and states
+METRICS_HOST = "127.0.0.1"  # Metrics are only served locally
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))  # 0 disables the /metrics endpoint; worker N serves on METRICS_PORT + N
+SHEETS_QUOTA_PER_MINUTE = 60  # Google's per-user Sheets quota; the rate limiter stays within it
+SHEETS_BURST = 10  # Sheets calls allowed back to back before the rate limiter spaces them out
+SHEETS_MAX_RETRIES = 4  # Retries for a Sheets call refused with 429 or 5xx
+SHEETS_BACKOFF_BASE = 1  # Seconds of the first retry's backoff window, doubled on each retry
+SHEETS_BACKOFF_CAP = 16  # Longest backoff window in seconds
+SHEETS_THREADS = 6  # Threads for work that calls Sheets; rate limit waits and backoffs hold them, not the shared executor
 
 # Initialize Telegram bot
-app = Client("icon_camp_bot", api_id=api_id, api_hash=api_hash, bot_token=bot_token)
+# Every worker needs its own Pyrogram session file
+session_name = "icon_camp_bot" if WORKER_COUNT == 1 else f"icon_camp_bot_{WORKER_INDEX}"
+app = Client(session_name, api_id=api_id, api_hash=api_hash, bot_token=bot_token)
+
+# Session Store
+class PersistentStore(MutableMapping):
+    """A dict of user_id -> JSON value mirrored to an SQLite table so it survives restarts.
+
+    Reads are served from memory and every write goes straight to disk. Entries expire
+    ttl seconds after they were last written. A shared store is also written by other
+    worker processes, so each read goes back to disk for the current value.
+    """
+
+    def __init__(self, connection, lock, table, ttl, shared=False):
+        self.connection = connection
+        self.lock = lock
+        self.table = table
+        self.ttl = ttl
+        self.shared = shared
+        self.data = {}
+        self.updated_at = {}
+        with self.lock:
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(user_id INTEGER PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self.connection.execute(f"DELETE FROM {table} WHERE updated_at < ?", (time.time() - ttl,))
+            self.connection.commit()
+            for user_id, value, updated_at in self.connection.execute(
+                f"SELECT user_id, value, updated_at FROM {table}"
+            ):
+                self.data[user_id] = json.loads(value)
+                self.updated_at[user_id] = updated_at
+
+    def load(self, user_id):
+        """Re-read one entry from disk."""
+        with self.lock:
+            row = self.connection.execute(
+                f"SELECT value, updated_at FROM {self.table} WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        if row is None:
+            self.data.pop(user_id, None)
+            self.updated_at.pop(user_id, None)
+        else:
+            self.data[user_id] = json.loads(row[0])
+            self.updated_at[user_id] = row[1]
+
+    def __getitem__(self, user_id):
+        if self.shared:
+            self.load(user_id)
+        if time.time() - self.updated_at.get(user_id, 0) > self.ttl:
+            if user_id in self.data:
+                del self[user_id]
+            raise KeyError(user_id)
+        return self.data[user_id]
+
+    def __setitem__(self, user_id, value):
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO {self.table} (user_id, value, updated_at) VALUES (?, ?, ?)",
+                (user_id, json.dumps(value), now),
+            )
+            self.connection.commit()
+        self.data[user_id] = value
+        self.updated_at[user_id] = now
+
+    def __delitem__(self, user_id):
+        if self.shared:
+            self.load(user_id)
+        del self.data[user_id]
+        self.updated_at.pop(user_id, None)
+        with self.lock:
+            self.connection.execute(f"DELETE FROM {self.table} WHERE user_id = ?", (user_id,))
+            self.connection.commit()
+
+    def __iter__(self):
+        if self.shared:
+            with self.lock:
+                return iter([row[0] for row in self.connection.execute(f"SELECT user_id FROM {self.table}")])
+        return iter(list(self.data))
+
+    def __len__(self):
+        if self.shared:
+            with self.lock:
+                return self.connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        return len(self.data)
+
+    def evict_expired(self):
+        """Drop every entry whose ttl has passed, in memory and on disk."""
+        cutoff = time.time() - self.ttl
+        for user_id in [user_id for user_id, updated_at in list(self.updated_at.items()) if updated_at < cutoff]:
+            self.data.pop(user_id, None)
+            self.updated_at.pop(user_id, None)
+        with self.lock:
+            self.connection.execute(f"DELETE FROM {self.table} WHERE updated_at < ?", (cutoff,))
+            self.connection.commit()
+
+state_db = sqlite3.connect(SESSION_DB_PATH, check_same_thread=False)
+state_db.execute("PRAGMA journal_mode=WAL")
+state_db.execute("PRAGMA synchronous=NORMAL")
+state_db_lock = threading.Lock()
 
 # Dictionary to keep track of user states
-user_states = {}
+user_states = PersistentStore(state_db, state_db_lock, "user_states", STATE_TTL, shared=WORKER_COUNT > 1)
 # Dictionary to keep track of user sessions
-user_sessions = {}
+user_sessions = PersistentStore(state_db, state_db_lock, "user_sessions", SESSION_TTL, shared=WORKER_COUNT > 1)
 
-# Lock file path
-lock_file_path = "sheet.lock"
+def evict_expired_sessions():
+    user_sessions.evict_expired()
+    user_states.evict_expired()
 
 # List of clubs
 clubs = [
@@ -98,24 +302,631 @@ essential_links = [
 
 # ThreadPoolExecutor for handling concurrent requests
 executor = ThreadPoolExecutor(max_workers=10)
+sheets_executor = ThreadPoolExecutor(max_workers=SHEETS_THREADS, thread_name_prefix="sheets")
+
+# Callback Tokens
+class CallbackTokens:
+    """Short tokens that stand in callback_data for context kept on the server.
+
+    A button carries only its token, so a handler gets the month, date, booking slice or
+    club it needs with one dictionary lookup instead of parsing callback_data. Issued tokens
+    are evicted least recently used first; pinned tokens, for buttons built at import, are
+    kept for good. Issued tokens start with a random per-process prefix, so buttons from
+    before a restart resolve to nothing rather than to someone else's context.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.contexts = OrderedDict()
+        self.pinned = {}
+        self.prefix = secrets.token_hex(2)
+        self.ids = count()
+        self.lock = threading.Lock()
+
+    def issue(self, context):
+        token = f"{self.prefix}{next(self.ids):x}"
+        with self.lock:
+            self.contexts[token] = context
+            if len(self.contexts) > self.capacity:
+                self.contexts.popitem(last=False)
+        return token
+
+    def pin(self, token, context):
+        self.pinned[token] = context
+
+    def resolve(self, token):
+        """Return the token's context, or None once it has been evicted."""
+        context = self.pinned.get(token)
+        if context is not None:
+            return context
+        with self.lock:
+            context = self.contexts.get(token)
+            if context is not None:
+                self.contexts.move_to_end(token)
+        return context
+
+callback_tokens = CallbackTokens(CALLBACK_TOKEN_CAPACITY)
+
+# Screen Navigation
+# The message whose button is being handled; the first screen shown for the tap replaces it
+navigation_message = contextvars.ContextVar("navigation_message", default=None)
+rendered_screens = OrderedDict()  # (chat id, message id) -> (text, keyboard) last shown there
+
+def remember_screen(message, text, reply_markup):
+    rendered_screens[(message.chat.id, message.id)] = (text, str(reply_markup))
+    rendered_screens.move_to_end((message.chat.id, message.id))
+    if len(rendered_screens) > RENDERED_SCREEN_CAPACITY:
+        rendered_screens.popitem(last=False)
+
+async def show_screen(message, text, reply_markup=None, **kwargs):
+    """Show a menu screen, editing the tapped message in place when possible.
+
+    The edit is skipped when the message already shows this text and keyboard, and only
+    the keyboard is edited when the text is unchanged. Photos and documents cannot become
+    text, so they, like any message that is not the one tapped, get a new message instead.
+    """
+    if navigation_message.get() is message and not (message.photo or message.document):
+        # Any further screens for this tap are sent as new messages below this one
+        navigation_message.set(None)
+        shown = rendered_screens.get((message.chat.id, message.id))
+        try:
+            if shown == (text, str(reply_markup)):
+                return message
+            if shown is not None and shown[0] == text:
+                edited = await message.edit_reply_markup(reply_markup)
+            else:
+                edited = await message.edit_text(text, reply_markup=reply_markup, **kwargs)
+        except MessageNotModified:
+            return message
+        except BadRequest as e:
+            # Messages Telegram will no longer edit fall back to a new message
+            print(f"Error editing message {message.id}: {e}")
+        else:
+            remember_screen(message, text, reply_markup)
+            return edited
+
+    sent = await message.reply_text(text, reply_markup=reply_markup, **kwargs)
+    remember_screen(sent, text, reply_markup)
+    return sent
+
+# Menu Layouts
+# Which roles see each option; the callback router enforces the same rules
+BOOKING_ROLES = ("OC",)
+STRENGTH_ROLES = ("OC", "Game Master")
+ATTENDANCE_ROLES = ("Facilitator", "Clan Head", "OC", "Game Master")
+REGISTRATION_ROLES = ("OC", "Game Master")
+BOOKLET_ROLES = ("Facilitator", "Freshmen")
+POINTS_ROLES = ("Facilitator", "OC", "Clan Head")
+IMPORT_ROLES = ("OC",)
+BROADCAST_ROLES = ("OC",)
+ATTENDANCE_ACTIONS = ("registration", "late_sign_in", "early_check_out")
+IMPORT_HINTS = {
+    "registration": "\n\n📎 You can also upload a CSV or XLSX file with one ID per row.",
+    "late_sign_in": "\n\n📎 You can also upload a CSV or XLSX file with one ID per row.",
+    "early_check_out": "\n\n📎 You can also upload a CSV or XLSX file with the ID, expected return and reason in each row.",
+}
+
+# Main menu rows as (roles, buttons); None means every role
+MAIN_MENU_LAYOUT = [
+    (BOOKING_ROLES, [("📚 View Bookings", "view_bookings")]),
+    (STRENGTH_ROLES, [("💪 Camp Strength", "show_strength")]),
+    (ATTENDANCE_ROLES, [("✍️ Attendance", "submit_ids")]),
+    (BOOKLET_ROLES, [("📖 Booklet", "view_booklets")]),
+    (POINTS_ROLES, [("👾 Points Matters", "points_matters"), ("📅 View Schedule", "view_schedule")]),
+    (None, [("📞 Important Contacts", "contact_person")]),
+    (None, [("☀️ Sentosa Guide", "sentosa_guide")]),
+    (None, [("❤️ SMU ICON Clubs", "explore_clubs"), ("🔗 Essential Links", "view_links")]),
+    (None, [("🍽 Food in SMU", "food_in_smu"), ("🗺️ Campus Map", "view_campus_map")]),
+    (None, [("🚪Log Out", "exit")]),
+]
+CONTACT_POSITIONS = ["Co-chair", "HR", "Programmes", "Operations", "Logistics"]
+
+def build_keyboard(rows):
+    """Build an inline keyboard from rows of (label, callback_data) pairs."""
+    return InlineKeyboardMarkup(
+        [[InlineKeyboardButton(label, callback_data=data) for label, data in row] for row in rows]
+    )
+
+def build_main_menu_keyboard(role):
+    return build_keyboard([row for roles, row in MAIN_MENU_LAYOUT if roles is None or role in roles])
+
+def build_submit_menu_keyboard(role):
+    rows = [[("📝 Registration", "registration")]] if role in REGISTRATION_ROLES else []
+    rows += [
+        [("⏰ Late Sign In", "late_sign_in")],
+        [("🏃‍♂️ Early Check Out", "early_check_out")],
+        [("🔙 Back to Main Menu", "main_menu")],
+    ]
+    return build_keyboard(rows)
+
+# Keyboards for roles in the Masterlist are built here; any other role gets its own on first use
+main_menu_keyboards = {
+    role: build_main_menu_keyboard(role) for role in set(ATTENDANCE_ROLES + BOOKLET_ROLES + POINTS_ROLES)
+}
+submit_menu_keyboards = {
+    role: build_submit_menu_keyboard(role) for role in ATTENDANCE_ROLES
+}
+
+def get_main_menu_keyboard(role):
+    keyboard = main_menu_keyboards.get(role)
+    if keyboard is None:
+        keyboard = main_menu_keyboards.setdefault(role, build_main_menu_keyboard(role))
+    return keyboard
+
+def get_submit_menu_keyboard(role):
+    keyboard = submit_menu_keyboards.get(role)
+    if keyboard is None:
+        keyboard = submit_menu_keyboards.setdefault(role, build_submit_menu_keyboard(role))
+    return keyboard
+
+BACK_TO_MAIN_MENU_KEYBOARD = build_keyboard([[("🔙 Back to Main Menu", "main_menu")]])
+LOGIN_MENU_KEYBOARD = build_keyboard([[("🔐 Login", "login")], [("🔰 Clans", "clans")]])
+CLANS_MENU_KEYBOARD = build_keyboard(
+    [
+        [("Merliosa", "clan_merliosa")],
+        [("Durio", "clan_durio")],
+        [("Orchidium", "clan_orchidium")],
+        [("Quilapius", "clan_quilapius")],
+        [("🔙 Back to Login Menu", "login_menu")],
+    ]
+)
+POINTS_MATTERS_KEYBOARD = build_keyboard(
+    [
+        [("📊 Retrieve Day 3 Credits", "get_d3_currency")],
+        [("📊 Retrieve Cumulative Subclan Points", "get_overall_subclan_points")],
+        [("🔙 Back to Main Menu", "main_menu")],
+    ]
+)
+SENTOSA_GUIDE_KEYBOARD = build_keyboard(
+    [
+        [("🗺️ Fort Siloso Map", "fort_siloso_map")],
+        [("📍Directions to Fort Siloso", "fort_siloso")],
+        [("📍 Directions to Madame Tussauds", "madame_tussauds")],
+        [("📍 Directions to SOSS/CIS", "soss_cis")],
+        [("🔙 Back to Main Menu", "main_menu")],
+    ]
+)
+FOOD_IN_SMU_KEYBOARD = InlineKeyboardMarkup(
+    [
+        [
+            InlineKeyboardButton(
+                "🍽 Food in SMU",
+                url="https://www.smu.edu.sg/campus-life/visiting-smu/food-beverages-listing",
+            )
+        ],
+        [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]
+    ]
+)
+CLUB_LIST_KEYBOARD = build_keyboard(
+    [[(club, f"club_{index}")] for index, club in enumerate(clubs)] + [[("🔙 Back to Main Menu", "main_menu")]]
+)
+POSITIONS_KEYBOARD = build_keyboard(
+    [[(position, f"position_{position}")] for position in CONTACT_POSITIONS] + [[("🔙 Back to Main Menu", "main_menu")]]
+)
+BACK_TO_CONTACTS_KEYBOARD = build_keyboard([[("🔙 Back to Contact List", "contact_person")]])
+ESSENTIAL_LINKS_MESSAGE = "🔗 **Essential Links** 🔗\n\n" + "".join(f"[{name}]({url})\n" for name, url in essential_links)
+
+
+# Async I/O
+event_loop = None  # The bot's event loop, set by main() so worker threads can send messages
+
+def send_message_from_thread(chat_id, text):
+    """Send a Telegram message from a worker thread through the bot's event loop."""
+    if event_loop is None:
+        print(f"Cannot message {chat_id} before the bot has started: {text}")
+        return
+    future = asyncio.run_coroutine_threadsafe(app.send_message(chat_id, text), event_loop)
+    try:
+        future.result(timeout=30)
+    except Exception as e:
+        print(f"Error messaging {chat_id}: {e}")
+
+async def run_blocking(func, *args):
+    """Run a blocking requests, disk or database call on the executor so the event loop keeps serving other users."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, func, *args)
+
+async def run_sheets(func, *args):
+    """Run a blocking call that may reach Google Sheets on its own executor.
+
+    Such calls can sit in the rate limiter or a 429 backoff for seconds, so they must not
+    take the threads that disk, HTTP and database work run on.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(sheets_executor, func, *args)
+
+def read_text_file(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return file.read().strip()
+
+# Metrics
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+class LatencyHistogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout."""
+
+    def __init__(self):
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q):
+        """Estimate a quantile as the upper bound of the bucket it falls in."""
+        if not self.count:
+            return 0.0
+        for bound, bucket_count in zip(LATENCY_BUCKETS, self.bucket_counts):
+            if bucket_count >= q * self.count:
+                return bound
+        return float("inf")
+
+metrics_lock = threading.Lock()
+handler_latency = defaultdict(LatencyHistogram)  # handler name -> histogram
+handler_errors = defaultdict(int)  # handler name -> failed calls
+api_latency = defaultdict(LatencyHistogram)  # (service, target) -> histogram
+api_calls = defaultdict(int)  # (service, target, method) -> calls
+api_errors = defaultdict(int)  # (service, target, method) -> failed calls
+recent_sheets_calls = deque()  # Timestamps of Sheets calls in the last minute
+
+def record_handler(name, seconds, failed):
+    with metrics_lock:
+        handler_latency[name].observe(seconds)
+        if failed:
+            handler_errors[name] += 1
+
+def record_api_call(service, target, method, seconds, failed):
+    with metrics_lock:
+        api_latency[(service, target)].observe(seconds)
+        api_calls[(service, target, method)] += 1
+        if failed:
+            api_errors[(service, target, method)] += 1
+        if service == "sheets":
+            now = time.time()
+            recent_sheets_calls.append(now)
+            while recent_sheets_calls and now - recent_sheets_calls[0] > 60:
+                recent_sheets_calls.popleft()
+
+def sheets_calls_last_minute():
+    with metrics_lock:
+        cutoff = time.time() - 60
+        return sum(1 for called_at in recent_sheets_calls if called_at > cutoff)
+
+async def timed_handler(name, handler, *args):
+    """Await handler(*args), recording its latency and whether it raised under name."""
+    started = time.perf_counter()
+    failed = False
+    try:
+        return await handler(*args)
+    except Exception:
+        failed = True
+        raise
+    finally:
+        record_handler(name, time.perf_counter() - started, failed)
+
+def timed_api_call(service, target, method, func, *args, **kwargs):
+    """Call a gspread, Drive or requests function, recording its latency and outcome."""
+    started = time.perf_counter()
+    failed = False
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        failed = True
+        raise
+    finally:
+        record_api_call(service, target, method, time.perf_counter() - started, failed)
+
+class InstrumentedSheet:
+    """Wraps a gspread Spreadsheet or Worksheet so every method call is rate limited, retried and counted against its title."""
+
+    def __init__(self, target):
+        self._target = target
+        self._label = target.title
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if name.startswith("_") or not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            return call_sheets_api(self._label, name, value, *args, **kwargs)
+
+        return call
+
+    @property
+    def sheet1(self):
+        return InstrumentedSheet(self._target.sheet1)
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def render_histogram(lines, name, labels, histogram):
+    for bound, bucket_count in zip(LATENCY_BUCKETS, histogram.bucket_counts):
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {bucket_count}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+    lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+def render_prometheus_metrics():
+    """Render every metric in the Prometheus text exposition format."""
+    with metrics_lock:
+        lines = [
+            "# HELP icon_handler_latency_seconds Time spent handling a button or message.",
+            "# TYPE icon_handler_latency_seconds histogram",
+        ]
+        for name, histogram in sorted(handler_latency.items()):
+            render_histogram(lines, "icon_handler_latency_seconds", f'handler="{escape_label(name)}"', histogram)
+        lines += [
+            "# HELP icon_handler_errors_total Handler calls that raised an exception.",
+            "# TYPE icon_handler_errors_total counter",
+        ]
+        for name, errors in sorted(handler_errors.items()):
+            lines.append(f'icon_handler_errors_total{{handler="{escape_label(name)}"}} {errors}')
+        lines += [
+            "# HELP icon_api_latency_seconds Time spent in Sheets, Drive and HTTP calls.",
+            "# TYPE icon_api_latency_seconds histogram",
+        ]
+        for (service, target), histogram in sorted(api_latency.items()):
+            labels = f'service="{service}",target="{escape_label(target)}"'
+            render_histogram(lines, "icon_api_latency_seconds", labels, histogram)
+        lines += [
+            "# HELP icon_api_calls_total Sheets, Drive and HTTP calls by worksheet or host and method.",
+            "# TYPE icon_api_calls_total counter",
+        ]
+        for (service, target, method), calls in sorted(api_calls.items()):
+            labels = f'service="{service}",target="{escape_label(target)}",method="{method}"'
+            lines.append(f"icon_api_calls_total{{{labels}}} {calls}")
+        lines += [
+            "# HELP icon_api_errors_total Sheets, Drive and HTTP calls that raised an exception.",
+            "# TYPE icon_api_errors_total counter",
+        ]
+        for (service, target, method), errors in sorted(api_errors.items()):
+            labels = f'service="{service}",target="{escape_label(target)}",method="{method}"'
+            lines.append(f"icon_api_errors_total{{{labels}}} {errors}")
+    lines += [
+        "# HELP icon_sheets_calls_last_minute Sheets calls in the last 60 seconds, to compare with the quota.",
+        "# TYPE icon_sheets_calls_last_minute gauge",
+        f"icon_sheets_calls_last_minute {sheets_calls_last_minute()}",
+        "# HELP icon_attendance_journal_pending Journaled attendance submissions not yet written to the sheets.",
+        "# TYPE icon_attendance_journal_pending gauge",
+        f"icon_attendance_journal_pending {count_pending_attendance()}",
+    ]
+    return "\n".join(lines) + "\n"
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server():
+    """Serve /metrics on METRICS_HOST:METRICS_PORT from a daemon thread; a port of 0 turns it off."""
+    if not METRICS_PORT:
+        return None
+    try:
+        server = ThreadingHTTPServer((METRICS_HOST, METRICS_PORT + WORKER_INDEX), MetricsRequestHandler)
+    except OSError as e:
+        print(f"Error starting metrics server: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"Metrics: serving http://{METRICS_HOST}:{METRICS_PORT + WORKER_INDEX}/metrics")
+    return server
+
+# Sheets Scheduler
+PRIORITY_ATTENDANCE = 0  # Attendance writes and the reads they depend on
+PRIORITY_READ = 1  # Lookups a user is waiting on
+PRIORITY_BACKGROUND = 2  # Periodic cache refreshes
+SHEETS_ERRORS = (APIError, requests.exceptions.RequestException)
+
+class SheetsRateLimiter:
+    """Token bucket sized to the Sheets quota that hands out tokens in priority order."""
+
+    def __init__(self, per_minute, burst):
+        self.rate = per_minute / 60
+        self.capacity = burst
+        self.tokens = burst
+        self.refilled_at = time.monotonic()
+        self.waiting = []  # Heap of (priority, arrival) tickets
+        self.arrivals = count()
+        self.condition = threading.Condition()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    def acquire(self, priority):
+        """Block until a token is free and no call of higher priority is still waiting."""
+        with self.condition:
+            ticket = (priority, next(self.arrivals))
+            heapq.heappush(self.waiting, ticket)
+            while True:
+                self.refill()
+                if self.waiting[0] == ticket and self.tokens >= 1:
+                    break
+                self.condition.wait(max((1 - self.tokens) / self.rate, 0.01))
+            heapq.heappop(self.waiting)
+            self.tokens -= 1
+            self.condition.notify_all()
+
+    def drain(self):
+        """Empty the bucket after a 429 so every caller backs off, not just the one that was refused."""
+        with self.condition:
+            self.refill()
+            self.tokens = 0
+
+# Workers each read the sheets for their own caches, so they split the quota between them
+sheets_rate_limiter = SheetsRateLimiter(SHEETS_QUOTA_PER_MINUTE / WORKER_COUNT, SHEETS_BURST)
+sheets_priority_state = threading.local()
+
+@contextmanager
+def sheets_priority(priority):
+    """Run the Sheets calls made by this thread inside the block at the given priority."""
+    previous = getattr(sheets_priority_state, "priority", PRIORITY_READ)
+    sheets_priority_state.priority = priority
+    try:
+        yield
+    finally:
+        sheets_priority_state.priority = previous
+
+def sheets_error_status(e):
+    """Return the HTTP status of a failed Sheets call, or None if the request never got an answer."""
+    response = getattr(e, "response", None)
+    return getattr(response, "status_code", None)
+
+def is_transient_sheets_error(e):
+    """Whether a failed Sheets call may succeed if simply tried again: a 429, a 5xx or no answer at all."""
+    if not isinstance(e, SHEETS_ERRORS):
+        return False
+    status = sheets_error_status(e)
+    return status is None or status == 429 or status >= 500
+
+def call_sheets_api(target, method, func, *args, **kwargs):
+    """Make one Sheets call through the rate limiter, retrying 429s, 5xx and dropped connections.
+
+    Retries wait a random time of up to SHEETS_BACKOFF_BASE * 2**attempt seconds (full jitter),
+    capped at SHEETS_BACKOFF_CAP. Any other error, or the last failed attempt, is raised to the caller.
+    """
+    priority = getattr(sheets_priority_state, "priority", PRIORITY_READ)
+    for attempt in range(SHEETS_MAX_RETRIES + 1):
+        sheets_rate_limiter.acquire(priority)
+        try:
+            return timed_api_call("sheets", target, method, func, *args, **kwargs)
+        except SHEETS_ERRORS as e:
+            status = sheets_error_status(e)
+            if not is_transient_sheets_error(e) or attempt == SHEETS_MAX_RETRIES:
+                raise
+            if status == 429:
+                sheets_rate_limiter.drain()
+            delay = random.uniform(0, min(SHEETS_BACKOFF_CAP, SHEETS_BACKOFF_BASE * 2 ** attempt))
+            print(f"Error calling {method} on {target} ({status}), retrying in {delay:.1f}s: {e}")
+            time.sleep(delay)
+
+def sheets_error_message(e):
+    """Explain a failed Sheets call to the user instead of pretending the data is missing."""
+    status = sheets_error_status(e)
+    if status == 429:
+        return "⏳ Google Sheets is busy right now. Please try again in a minute."
+    if status is None:
+        return "❌ Could not reach Google Sheets. Please try again shortly."
+    return f"❌ Google Sheets returned an error ({status}). Please try again shortly."
+
+# Background Refresh
+def start_background_refresh(name, refresh, interval):
+    """Run refresh() every interval seconds on a daemon thread, keeping the last good data on errors."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                with sheets_priority(PRIORITY_BACKGROUND):
+                    refresh()
+            except Exception as e:
+                print(f"Error refreshing {name}: {e}")
+
+    thread = threading.Thread(target=loop, name=f"refresh-{name}", daemon=True)
+    thread.start()
+    return thread
+
+# Sheet-backed Caches
+sheet_caches = {}
+
+def get_spreadsheet_modified_time(spreadsheet):
+    """Return the spreadsheet's Drive modifiedTime with a single metadata request."""
+    metadata = timed_api_call(
+        "drive",
+        spreadsheet.title,
+        "modifiedTime",
+        get_gspread_client().get_file_drive_metadata,
+        spreadsheet.id,
+    )
+    return metadata["modifiedTime"]
 
-# Utility Functions
-def acquire_lock():
-    """Acquire the lock by creating a lock file."""
-    while os.path.exists(lock_file_path):
-        time.sleep(0.1)  # Wait for the lock to be released
-    open(lock_file_path, "w").close()  # Create the lock file
+def get_cached_sheet_data(name, spreadsheet_key, build):
+    """Return build() cached under name, rebuilt only when the spreadsheet is edited.
 
-def release_lock():
-    """Release the lock by deleting the lock file."""
-    if os.path.exists(lock_file_path):
-        os.remove(lock_file_path)
+    The Drive modified time is checked at most once per SHEET_CHANGE_CHECK_INTERVAL, so
+    reads in between cost no API calls at all.
+    """
+    cache = sheet_caches.setdefault(
+        name, {"value": None, "modified_time": None, "checked_at": 0, "lock": threading.Lock()}
+    )
+    if cache["value"] is not None and time.time() - cache["checked_at"] < SHEET_CHANGE_CHECK_INTERVAL:
+        return cache["value"]
+
+    with cache["lock"]:
+        # Another thread may have refreshed the entry while we waited for the lock
+        if cache["value"] is not None and time.time() - cache["checked_at"] < SHEET_CHANGE_CHECK_INTERVAL:
+            return cache["value"]
+        try:
+            modified_time = get_spreadsheet_modified_time(get_spreadsheet(spreadsheet_key))
+        except Exception as e:
+            print(f"Error checking {name} for changes: {e}")
+            modified_time = None
+        if cache["value"] is None or modified_time is None or modified_time != cache["modified_time"]:
+            cache["value"] = build()
+            cache["modified_time"] = modified_time
+        cache["checked_at"] = time.time()
+        return cache["value"]
+
+# Masterlist Index
+masterlist_by_username = {}
+masterlist_by_id = {}
+masterlist_refreshed_at = 0
+masterlist_refresh_lock = threading.Lock()
+
+def refresh_masterlist_index(max_age=None):
+    """Download the Masterlist once and rebuild the username and Student ID lookups.
+
+    With max_age, the download is skipped if the index is already younger than that, which
+    covers threads that queued on the lock while another thread was refreshing.
+    """
+    global masterlist_by_username, masterlist_by_id, masterlist_refreshed_at
+    with masterlist_refresh_lock:
+        if max_age is not None and time.time() - masterlist_refreshed_at < max_age:
+            return
+        expected_headers = ["Student ID", "Matriculated Name", "Telegram Username", "Role", "SUBCLAN"]
+        masterlist = get_worksheet("masterlist").get_all_records(expected_headers=expected_headers)
+        by_username = {}
+        by_id = {}
+        for record in masterlist:
+            by_username.setdefault(record["Telegram Username"], record)
+            by_id[str(record["Student ID"]).zfill(8)] = record
+        # Swap in the new lookups in one step so readers never see a half-built index
+        masterlist_by_username, masterlist_by_id = by_username, by_id
+        masterlist_refreshed_at = time.time()
+
+def refresh_masterlist_index_on_miss():
+    """Refresh the index for an unknown user or ID, at most once per MASTERLIST_MISS_REFRESH_INTERVAL.
+
+    Sheets errors are raised rather than reported as a miss, so nobody is told they are not on the
+    Masterlist just because the sheet could not be read.
+    """
+    if time.time() - masterlist_refreshed_at < MASTERLIST_MISS_REFRESH_INTERVAL:
+        return False
+    # Concurrent misses share one download: whoever gets the lock first refreshes, the rest reuse it
+    refresh_masterlist_index(max_age=MASTERLIST_MISS_REFRESH_INTERVAL)
+    return True
 
 # User Validation
 def validate_ids(ids):
     """Validate IDs against the Masterlist."""
-    masterlist_ids = masterlist_sheet.col_values(1)
-    invalid_ids = [id for id in ids if id not in masterlist_ids]
+    invalid_ids = [id for id in ids if id not in masterlist_by_id]
+    if invalid_ids and refresh_masterlist_index_on_miss():
+        invalid_ids = [id for id in invalid_ids if id not in masterlist_by_id]
     if invalid_ids:
         return False, f"❌ The following ID(s) is / are not valid:\n" + "\n".join(invalid_ids) + "\nPlease re-submit ID(s) again."
     return True, ""
@@ -123,11 +934,10 @@ def validate_ids(ids):
 def check_user_access(username):
     """Check if the user's telegram handle exists in the Masterlist."""
     # print(username)
-    expected_headers = ["Student ID", "Matriculated Name", "Telegram Username", "Role", "SUBCLAN"]
-    masterlist = masterlist_sheet.get_all_records(expected_headers=expected_headers)
     username = "@" + username
-    user_record = next(
-        (record for record in masterlist if record["Telegram Username"] == username), None)
+    user_record = masterlist_by_username.get(username)
+    if user_record is None and refresh_masterlist_index_on_miss():
+        user_record = masterlist_by_username.get(username)
 
     if user_record:
         matriculated_name = user_record.get("Matriculated Name")
@@ -139,92 +949,31 @@ def check_user_access(username):
 
 def get_names(ids):
     """Get names for the given IDs from the Masterlist."""
-    expected_headers = ["Student ID", "Matriculated Name", "Telegram Username", "Role"]
-    masterlist = masterlist_sheet.get_all_records(expected_headers=expected_headers)
-    id_name_map = {str(record["Student ID"]).zfill(8): record["Matriculated Name"] for record in masterlist}
-    return [id_name_map[id] for id in ids]
-
-def handle_allowed_user(client, callback_query, data):
-    session_data = user_sessions[callback_query.from_user.id]
-    # print(f"USER SESSIONS: {user_sessions}")
-    role = session_data.get("role")
-    subclan = session_data.get("subclan")
-    user_id = callback_query.from_user.id
-    # print(user_id)
-    # print(user_sessions)
-    if user_id not in user_sessions:
-        callback_query.message.reply_text("❌ Access denied. Please login by pressing /start to continue.")
-        return
-
-    handlers = {
-        "submit_ids": lambda: show_submit_menu(client, callback_query.message, role),
-        "get_overall_subclan_points": lambda: handle_get_overall_points(client, callback_query, role, subclan),
-        "get_d3_currency": lambda: handle_get_d3_currency(client, callback_query, role, subclan),
-        "points_matters": lambda: show_points_matters(client, callback_query.message),
-        "explore_clubs": lambda: show_club_list(client, callback_query.message),
-        "contact_person": lambda: show_positions(client, callback_query.message),
-        "view_links": lambda: show_essential_links(client, callback_query.message),
-        "view_bookings": lambda: show_oc_booking_months(client, callback_query.message, get_oc_bookings()),
-        "show_strength": lambda: handle_show_strength(callback_query),
-        "view_campus_map": lambda: handle_view_campus_map(callback_query),
-        "fort_siloso": lambda: handle_sentosa_location_request(callback_query, "fort_siloso"),
-        "madame_tussauds": lambda: handle_sentosa_location_request(callback_query, "madame_tussauds"),
-        "sentosa_guide": lambda: show_sentosa_guide(client, callback_query.message),
-        "fort_siloso_map": lambda: handle_fort_siloso_map_request(client, callback_query),
-        "soss_cis": lambda: handle_sentosa_location_request(callback_query, "soss_cis"),
-        "food_in_smu": lambda: show_food_in_smu(client, callback_query.message),
-        "help": lambda: callback_query.message.reply_text("ℹ️ Key in /start to get started."),
-        "begin_adventure": lambda: handle_begin_adventure(callback_query),
-        "exit": lambda: handle_logout(callback_query),
-        "main_menu": lambda: show_menu_and_clear_state(client, callback_query.message, user_id),
-        "view_schedule": lambda: handle_get_schedule(client, callback_query, role, subclan),
-        "get_schedule_day 1": lambda: handle_view_day_schedule(callback_query, "Day 1"),
-        "get_schedule_day 3": lambda: handle_view_day_schedule(callback_query, "Day 3"),
-        "view_booklets": lambda: handle_view_booklets(callback_query),  # New handler for viewing booklets
-    }
-
-    # Dynamic handlers for data with prefixes
-    dynamic_handlers = {
-        "m_": lambda d: handle_view_dates(callback_query, d),
-        "d_": lambda d: handle_view_facility_types(callback_query, d),
-        "f_": lambda d: handle_view_facility_type(callback_query, d),
-        "fp_": lambda d: handle_view_facility_type(callback_query, d),
-        "position_": lambda d: handle_view_contact(callback_query, d),
-        "club_": lambda d: handle_view_club(callback_query, d),
-    }
-
-    if data in handlers:
-        handlers[data]()
-    else:
-        for prefix, handler in dynamic_handlers.items():
-            if data.startswith(prefix):
-                handler(data)
-                return
-
-        if data in ["registration", "late_sign_in", "early_check_out"]:
-            handle_submit_action(callback_query, data)
-        else:
-            callback_query.message.reply_text("❌ Invalid option. Press /start to log in.")
+    return [masterlist_by_id[id]["Matriculated Name"] for id in ids]
 
 # User Login and Logout
-def handle_login(callback_query, user_username):
+async def handle_login(callback_query, user_username):
     username = user_username
 
     if username is None:
-        callback_query.message.reply_text("❌ Please set a Telegram username to use this bot.")
+        await callback_query.message.reply_text("❌ Please set a Telegram username to use this bot.")
         return
 
-    has_access, user_name, role, subclan = check_user_access(username)
+    try:
+        has_access, user_name, role, subclan = await run_sheets(check_user_access, username)
+    except SHEETS_ERRORS as e:
+        print(f"Error checking access for {username}: {e}")
+        await callback_query.message.reply_text(sheets_error_message(e))
+        return
     if has_access:
         user_sessions[callback_query.from_user.id] = {
             "username": username,
             "role": role,
             "subclan": subclan,
         }
-        with open("misc/storyline.txt", "r", encoding="utf-8") as file:
-            storyline = file.read().strip()
+        storyline = await run_blocking(read_text_file, "misc/storyline.txt")
 
-        callback_query.message.reply_text(
+        await callback_query.message.reply_text(
             f"Greetings, {user_name}.\n\n{storyline}",
             reply_markup=InlineKeyboardMarkup(
                 [
@@ -238,232 +987,261 @@ def handle_login(callback_query, user_username):
             ),
         )
     else:
-        callback_query.message.reply_text("❌ Access denied. Please login by pressing /start to continue.")
+        await callback_query.message.reply_text("❌ Access denied. Please login by pressing /start to continue.")
         return
 
-def handle_begin_adventure(callback_query):
+async def handle_begin_adventure(callback_query):
     user_username = callback_query.from_user.username
     user_id = callback_query.from_user.id
-    _, user_name, _, _ = check_user_access(user_username)
+    _, user_name, _, _ = await run_sheets(check_user_access, user_username)
     session_data = user_sessions[user_id]
     role = session_data.get("role")
     subclan = session_data.get("subclan")
 
+    # The welcome is a new message, so the menu goes below it rather than over the storyline
+    navigation_message.set(None)
     if role == "Freshmen":
-        callback_query.message.reply_text(
+        await callback_query.message.reply_text(
             f"Welcome to the Island Of Chronosia, Adventurer {user_name}! We hope that these 3 days of ICON Camp will kick start your University life at SMU :D"
         )
     else:
-        callback_query.message.reply_text(
+        await callback_query.message.reply_text(
             f"Welcome back, {user_name}. Your role in ICON CAMP 2024 is {role}.\nPlease select a corresponding action to continue."
         )
-    show_menu(app, callback_query.message)
+    await show_menu(app, callback_query.message)
 
-def handle_logout(callback_query):
+async def handle_logout(callback_query):
     user_id = callback_query.from_user.id
     if user_id in user_sessions:
         del user_sessions[user_id]
-    callback_query.message.reply_text("👋 You have been logged out. Have a good day!")
-    show_login_menu(client, callback_query.message)
+    navigation_message.set(None)
+    await callback_query.message.reply_text("👋 You have been logged out. Have a good day!")
+    await show_login_menu(app, callback_query.message)
 
 # Schedule
-def parse_schedule_d1(file_path):
-    with open(file_path, 'r', encoding = 'utf-8') as file:
-        data = file.read()
-    
-    subclan_schedules = {}
-    subclan_name = None
-    schedule = ""
-    
-    lines = data.splitlines()
-    for line in lines:
-        if line.startswith("Schedule for "):
-            if subclan_name:
-                subclan_schedules[subclan_name] = schedule.strip()
-            subclan_name = line.replace("Schedule for ", "").strip(":")
-            schedule = ""
-        elif line.strip():
-            schedule += line + "\n"
-            if not line.startswith("*"):
-                schedule += "\n"
-    
-    if subclan_name:
-        subclan_schedules[subclan_name] = schedule.strip()
-    
-    return subclan_schedules
+SCHEDULE_FILE_PATTERN = re.compile(r"all_subclans_schedule_d(\d+)\.txt$")
+schedule_index = {"mtimes": {}, "days": [], "messages": {}}  # Replaced whole by load_schedules, never mutated
 
-def parse_schedule_d3(file_path):
+def parse_schedule(file_path):
+    """Split a day's schedule file into {subclan: schedule text}, one "Schedule for X:" block per subclan."""
     with open(file_path, 'r', encoding = 'utf-8') as file:
-        data = file.read()
-    
+        lines = file.read().splitlines()
+
     subclan_schedules = {}
     subclan_name = None
-    schedule = ""
-    
-    lines = data.splitlines()
+    schedule = []
     for line in lines:
         if line.startswith("Schedule for "):
             if subclan_name:
-                subclan_schedules[subclan_name] = schedule.strip()
+                subclan_schedules[subclan_name] = "".join(schedule).strip()
             subclan_name = line.replace("Schedule for ", "").strip(":")
-            schedule = ""
+            schedule = []
         elif line.strip():
-            schedule += line + "\n"
-            if not line.startswith("*"):
-                schedule += "\n"
-    
+            # Entries are spaced by a blank line, except after "*" lines, which lead into the entry below
+            schedule.append(line + "\n" if line.startswith("*") else line + "\n\n")
+
     if subclan_name:
-        subclan_schedules[subclan_name] = schedule.strip()
-    
+        subclan_schedules[subclan_name] = "".join(schedule).strip()
+
     return subclan_schedules
 
-file_path_d1 = 'movement/all_subclans_schedule_d1.txt'
-schedule_d1 = parse_schedule_d1(file_path_d1)
+def find_schedule_files():
+    """Return {"Day N": path} for every schedule file in SCHEDULE_DIR, in day order."""
+    days = {}
+    for file_name in os.listdir(SCHEDULE_DIR):
+        match = SCHEDULE_FILE_PATTERN.match(file_name)
+        if match:
+            days[int(match.group(1))] = os.path.join(SCHEDULE_DIR, file_name)
+    return {f"Day {day}": days[day] for day in sorted(days)}
+
+def load_schedules():
+    """Rebuild the pre-rendered schedule index if any day file was added, removed or edited.
+
+    Readers always see either the old or the new index, since it is swapped in with one assignment.
+    """
+    global schedule_index
+    files = find_schedule_files()
+    mtimes = {path: os.stat(path).st_mtime for path in files.values()}
+    if mtimes == schedule_index["mtimes"]:
+        return
 
-file_path_d3 = 'movement/all_subclans_schedule_d3.txt'
-schedule_d3 = parse_schedule_d3(file_path_d3)
+    messages = {}
+    for day, path in files.items():
+        for subclan, schedule in parse_schedule(path).items():
+            messages[(subclan, day)] = f"Schedule for {subclan}:\n\n**{day.upper()} STATION GAMES**\n{schedule}"
+    schedule_index = {"mtimes": mtimes, "days": list(files), "messages": messages}
+    print(f"Loaded schedules for {', '.join(files) or 'no days'}")
 
-def handle_get_schedule(client, callback_query, role, subclan):
-    user_id = callback_query.from_user.id
+def day_button_label(day):
+    number = day.split()[-1]
+    # Single digits get a keycap emoji, matching the rest of the menu
+    return f"⏳ Day {number}️⃣" if len(number) == 1 else f"⏳ {day}"
+
+async def handle_get_schedule(client, callback_query, role, subclan):
     # Display the submenu for selecting the day
-    callback_query.message.reply_text(
+    buttons = [
+        [InlineKeyboardButton(day_button_label(day), callback_data=f"get_schedule_{day.lower()}")]
+        for day in schedule_index["days"]
+    ]
+    buttons.append([InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")])
+    await show_screen(
+        callback_query.message,
         "Please select the day for the schedule:",
-        reply_markup=InlineKeyboardMarkup(
-            [
-                [InlineKeyboardButton("⏳ Day 1️⃣", callback_data="get_schedule_day 1")],
-                [InlineKeyboardButton("⏳ Day 3️⃣", callback_data="get_schedule_day 3")],
-                [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]
-            ]
-        )
+        reply_markup=InlineKeyboardMarkup(buttons)
     )
 
 # Updated function to handle retrieving the schedule based on the role and day
-def handle_get_schedule_message(loading_message, role, subclan, text, day):
+async def handle_get_schedule_message(loading_message, role, subclan, text, day):
     subclan = subclan if role == "Facilitator" else text.strip().upper()
-    subclan_schedule = None
+    schedule_message = schedule_index["messages"].get((subclan, day))
 
-    if day == "Day 1":
-        subclan_schedule = schedule_d1.get(subclan)
-    elif day == "Day 3":
-        subclan_schedule = schedule_d3.get(subclan)
-
-    if not subclan_schedule:
-        loading_message.edit_text(
+    if not schedule_message:
+        await loading_message.edit_text(
             "❌ Subclan not found. Please enter a valid subclan.",
         )
         return
 
-    schedule_message = f"Schedule for {subclan}:\n\n"
-    schedule_message += f"**{day.upper()} STATION GAMES**\n{subclan_schedule}\n\n"
-
     # Add the "Back to Menu" button
     reply_markup = InlineKeyboardMarkup(
         [[InlineKeyboardButton("🔙 Back to Schedule Menu", callback_data="view_schedule")]]
     )
     
-    loading_message.edit_text(schedule_message.strip(), reply_markup=reply_markup)
+    await loading_message.edit_text(schedule_message, reply_markup=reply_markup)
 
-def handle_view_day_schedule(callback_query, day):
+async def handle_view_day_schedule(callback_query, day):
 
     user_id = callback_query.from_user.id
     user_session = user_sessions.get(user_id)
     if not user_session:
-        callback_query.message.reply_text("❌ Access denied. Please login by pressing /start to continue.")
+        await callback_query.message.reply_text("❌ Access denied. Please login by pressing /start to continue.")
         return
     
     role = user_session.get("role")
     subclan = user_session.get("subclan")
 
     if role == "Facilitator":
-        loading_message = callback_query.message.reply_text("Retrieving schedule, please wait...")
-        handle_get_schedule_message(loading_message, role, subclan, None, day)
+        loading_message = await callback_query.message.reply_text("Retrieving schedule, please wait...")
+        await handle_get_schedule_message(loading_message, role, subclan, None, day)
     else:
-        callback_query.message.reply_text("Which subclan schedule do you want to check?")
+        await callback_query.message.reply_text("Which subclan schedule do you want to check?")
         user_states[user_id] = f"get_schedule_{day.lower()}"
 
+# Scoreboard
+scoreboard = None  # subclan -> (cumulative points, Day 3 credits), None until first loaded
+scoreboard_subclans = []  # Names in column A of either score sheet, for listing rather than lookups
+scoreboard_lock = threading.Lock()
+
+def index_rows_by_cell(rows, col):
+    """Map every cell value to the given column of its row, keeping the first match like Worksheet.find."""
+    index = {}
+    for row in rows:
+        value = row[col - 1] if len(row) >= col else ""
+        for cell in row:
+            if cell:
+                index.setdefault(cell, value)
+    return index
+
+def refresh_scoreboard():
+    """Load "Final Points" and "Overall Day 3 Results" in one batched read and rebuild the snapshot."""
+    global scoreboard, scoreboard_subclans
+    response = get_spreadsheet("score").values_batch_get(
+        [f"'{WORKSHEET_TITLES['score'][1]}'", f"'{WORKSHEET_TITLES['bidding'][1]}'"]
+    )
+    points_rows, credit_rows = (value_range.get("values", []) for value_range in response["valueRanges"])
+    points = index_rows_by_cell(points_rows, 10)  # Column J
+    credits = index_rows_by_cell(credit_rows, 8)  # Column H
+    # The snapshot is keyed by every cell, so only column A below the header says which keys are subclans
+    scoreboard_subclans = sorted({row[0] for row in points_rows[1:] + credit_rows[1:] if row and row[0]})
+    scoreboard = {
+        subclan: (points.get(subclan), credits.get(subclan))
+        for subclan in points.keys() | credits.keys()
+    }
+
+def get_scoreboard():
+    """Return the snapshot, loading it now if the startup warm-up has not reached it yet."""
+    if scoreboard is None:
+        with scoreboard_lock:
+            if scoreboard is None:
+                refresh_scoreboard()
+    return scoreboard
+
 # Get points
 def get_points(subclan):
-    """Get points for the given subclan from the Score Sheet."""
-    try:
-        subclan = subclan.upper()  # Capitalize the subclan
-        cell = score_sheet.find(subclan)
-        if cell:
-            points = score_sheet.cell(cell.row, 10).value  # Column J
-            return points
-        else:
-            return None
-    except Exception as e:
-        print(f"Error fetching points: {e}")
+    """Get points for the given subclan from the scoreboard snapshot."""
+    if not subclan:
         return None
+    points, _ = get_scoreboard().get(subclan.upper(), (None, None))  # Capitalize the subclan
+    return points
 
-def handle_get_overall_subclan_points(loading_message, role, subclan, text):
+async def handle_get_overall_subclan_points(loading_message, role, subclan, text):
     subclan_to_check = subclan if role == "Facilitator" else text.strip().upper()
-    points = get_points(subclan_to_check)
-    
-    if points:
-        message_text = f"🏆 {subclan_to_check} has {points} points."
+    try:
+        points = await run_sheets(get_points, subclan_to_check)
+    except SHEETS_ERRORS as e:
+        print(f"Error retrieving points for {subclan_to_check}: {e}")
+        message_text = sheets_error_message(e)
     else:
-        message_text = f"❌ Subclan '{subclan_to_check}' not found. Please key in a proper subclan again."
+        if points:
+            message_text = f"🏆 {subclan_to_check} has {points} points."
+        else:
+            message_text = f"❌ Subclan '{subclan_to_check}' not found. Please key in a proper subclan again."
     
     reply_markup = InlineKeyboardMarkup(
         [
             [InlineKeyboardButton("🔙 Back to Points Menu", callback_data="points_matters")]
         ]
     )
-    loading_message.edit_text(message_text, reply_markup=reply_markup)
+    await loading_message.edit_text(message_text, reply_markup=reply_markup)
 
-def handle_get_overall_points(client, callback_query, role, subclan):
+async def handle_get_overall_points(client, callback_query, role, subclan):
     if role == "Facilitator":
-        loading_message = callback_query.message.reply_text("Retrieving points, please wait...")
-        handle_get_overall_subclan_points(loading_message, role, subclan, None)
+        loading_message = await callback_query.message.reply_text("Retrieving points, please wait...")
+        await handle_get_overall_subclan_points(loading_message, role, subclan, None)
     else:
-        callback_query.message.reply_text("Which subclan do you want to check?")
+        await callback_query.message.reply_text("Which subclan do you want to check?")
         user_states[callback_query.from_user.id] = "get_overall_subclan_points"
 
 # Get D3 Currency
 def get_d3_currency(subclan):
-    """Get points for the given subclan from the Score Sheet."""
-    try:
-        subclan = subclan.upper()  # Capitalize the subclan
-        cell = bidding_sheet.find(subclan)
-        if cell:
-            points = bidding_sheet.cell(cell.row, 8).value  # Column H
-            return points
-        else:
-            return None
-    except Exception as e:
-        print(f"Error fetching points: {e}")
+    """Get Day 3 credits for the given subclan from the scoreboard snapshot."""
+    if not subclan:
         return None
+    _, credits = get_scoreboard().get(subclan.upper(), (None, None))  # Capitalize the subclan
+    return credits
 
-def handle_get_d3_currency_points(loading_message, role, subclan, text):
+async def handle_get_d3_currency_points(loading_message, role, subclan, text):
     subclan_to_check = subclan if role == "Facilitator" else text.strip().upper()
-    points = get_d3_currency(subclan_to_check)
-    
-    if points:
-        message_text = f"🏆 {subclan_to_check} has {points} Day 3 credits."
+    try:
+        points = await run_sheets(get_d3_currency, subclan_to_check)
+    except SHEETS_ERRORS as e:
+        print(f"Error retrieving Day 3 credits for {subclan_to_check}: {e}")
+        message_text = sheets_error_message(e)
     else:
-        message_text = f"❌ Subclan '{subclan_to_check}' not found. Please key in a proper subclan again."
+        if points:
+            message_text = f"🏆 {subclan_to_check} has {points} Day 3 credits."
+        else:
+            message_text = f"❌ Subclan '{subclan_to_check}' not found. Please key in a proper subclan again."
     
     reply_markup = InlineKeyboardMarkup(
         [
             [InlineKeyboardButton("🔙 Back to Points Menu", callback_data="points_matters")]
         ]
     )
-    loading_message.edit_text(message_text, reply_markup=reply_markup)
+    await loading_message.edit_text(message_text, reply_markup=reply_markup)
 
-def handle_get_d3_currency(client, callback_query, role, subclan):
+async def handle_get_d3_currency(client, callback_query, role, subclan):
     if role == "Facilitator":
-        loading_message = callback_query.message.reply_text("Retrieving points, please wait...")
-        handle_get_d3_currency_points(loading_message, role, subclan, None)
+        loading_message = await callback_query.message.reply_text("Retrieving points, please wait...")
+        await handle_get_d3_currency_points(loading_message, role, subclan, None)
     else:
-        callback_query.message.reply_text("Which subclan do you want to check?")
+        await callback_query.message.reply_text("Which subclan do you want to check?")
         user_states[callback_query.from_user.id] = "get_d3_currency"
 
 
 # Bookings
-def get_oc_bookings():
+def build_oc_bookings():
     """Fetch and return confirmed bookings grouped by month, date, and facility type."""
-    all_values = venue_sheet.get_all_values()
+    all_values = get_worksheet("venue").get_all_values()
 
     headers = all_values[0]
     data_rows = all_values[1:]
@@ -478,12 +1256,16 @@ def get_oc_bookings():
     booking_status_col = col_indices["BookingStatus"]
     booking_ref_col = col_indices["Booking Reference Number"]
 
+    # Many bookings share a date, so each distinct date string is only parsed once
+    parsed_dates = {}
     bookings_by_month = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
     for row in data_rows:
         if row[booking_status_col].lower() == "confirmed":
             booking_date = row[booking_date_col]
-            month = datetime.strptime(booking_date, "%d-%b-%Y").strftime("%Y-%m")
-            date = datetime.strptime(booking_date, "%d-%b-%Y").strftime("%d-%b-%Y")
+            if booking_date not in parsed_dates:
+                parsed_date = datetime.strptime(booking_date, "%d-%b-%Y")
+                parsed_dates[booking_date] = (parsed_date.strftime("%Y-%m"), parsed_date.strftime("%d-%b-%Y"))
+            month, date = parsed_dates[booking_date]
             facility_type = row[facility_type_col]
             bookings_by_month[month][date][facility_type].append(
                 {
@@ -495,65 +1277,83 @@ def get_oc_bookings():
                 }
             )
 
-    for month in bookings_by_month:
-        for date in bookings_by_month[month]:
-            for facility_type in bookings_by_month[month][date]:
-                bookings_by_month[month][date][facility_type].sort(
-                    key=lambda x: datetime.strptime(x["Booking Date"], "%d-%b-%Y")
-                )
+    # Freeze into plain dicts so reads from the shared cache never insert missing keys
+    return {
+        month: {date: dict(facility_types) for date, facility_types in dates.items()}
+        for month, dates in bookings_by_month.items()
+    }
 
-    return bookings_by_month
+def get_oc_bookings():
+    """Return the cached booking tree, rebuilt only after the venue sheet is edited."""
+    return get_cached_sheet_data("oc_bookings", "venue", build_oc_bookings)
 
-def show_oc_booking_months(client, message, bookings_by_month):
+def booking_button(label, context):
+    """A button that opens the booking screen described by context."""
+    return InlineKeyboardButton(label, callback_data=f"bk_{callback_tokens.issue(context)}")
+
+async def show_oc_booking_months(client, message, bookings_by_month):
     """Display months as buttons for the user's confirmed bookings."""
-    unique_months = sorted(bookings_by_month.keys())
     buttons = [
-        [InlineKeyboardButton(month, callback_data=f"m_{month}")] for month in unique_months
+        [booking_button(month, {"view": "dates", "month": month, "dates": bookings_by_month[month]})]
+        for month in sorted(bookings_by_month)
     ]
     buttons.append(
         [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]
     )
 
     reply_markup = InlineKeyboardMarkup(buttons)
-    message.reply_text("📅 **Your Booking Months** 📅", reply_markup=reply_markup)
+    await show_screen(message, "📅 **Your Booking Months** 📅", reply_markup=reply_markup)
 
-def show_oc_booking_dates(client, message, month, bookings_by_month):
+async def show_oc_booking_dates(client, message, context):
     """Display dates as buttons for the user's confirmed bookings within the selected month."""
-    unique_dates = sorted(bookings_by_month[month].keys())
+    dates = context["dates"]
     buttons = [
-        [InlineKeyboardButton(date, callback_data=f"d_{month}_{date.replace(' ', '_')}")]
-        for date in unique_dates
+        [
+            booking_button(
+                date, {"view": "facility_types", "date": date, "facility_types": dates[date], "parent": context}
+            )
+        ]
+        for date in sorted(dates)
     ]
     buttons.append(
         [InlineKeyboardButton("🔙 Back to Months", callback_data="view_bookings")]
     )
 
     reply_markup = InlineKeyboardMarkup(buttons)
-    message.reply_text(f"📅 **Booking Dates for {month}** 📅", reply_markup=reply_markup)
+    await show_screen(message, f"📅 **Booking Dates for {context['month']}** 📅", reply_markup=reply_markup)
 
-def show_oc_booking_facility_types(client, message, month, date, bookings_by_month):
+async def show_oc_booking_facility_types(client, message, context):
     """Display facility types as buttons for the user's confirmed bookings within the selected date."""
-    unique_facility_types = sorted(bookings_by_month[month][date].keys())
+    facility_types = context["facility_types"]
     buttons = [
         [
-            InlineKeyboardButton(
+            booking_button(
                 facility_type,
-                callback_data=f"f_{month}_{date.replace(' ', '_')}_{facility_type}",
+                {
+                    "view": "bookings",
+                    "facility_type": facility_type,
+                    "bookings": facility_types[facility_type],
+                    "page": 1,
+                    "parent": context,
+                },
             )
         ]
-        for facility_type in unique_facility_types
+        for facility_type in sorted(facility_types)
     ]
     buttons.append(
-        [InlineKeyboardButton("🔙 Back to Dates", callback_data=f"m_{month}")]
+        [booking_button("🔙 Back to Dates", context["parent"])]
     )
     reply_markup = InlineKeyboardMarkup(buttons)
-    message.reply_text(f"📅 **Facility Types for {date}** 📅", reply_markup=reply_markup)
+    await show_screen(message, f"📅 **Facility Types for {context['date']}** 📅", reply_markup=reply_markup)
 
-def show_bookings_for_facility_type(client, message, month, date, facility_type, bookings_by_month, page=1):
+async def show_bookings_for_facility_type(client, message, context):
     """Display the bookings for the selected facility type with pagination."""
-    bookings = bookings_by_month.get(month, {}).get(date, {}).get(facility_type, [])
+    facility_type = context["facility_type"]
+    date = context["parent"]["date"]
+    bookings = context["bookings"]
+    page = context["page"]
     if not bookings:
-        message.reply_text(f"No bookings found for {facility_type} on {date}.")
+        await show_screen(message, f"No bookings found for {facility_type} on {date}.")
         return
 
     start_index = (page - 1) * BOOKINGS_PER_PAGE
@@ -573,52 +1373,135 @@ def show_bookings_for_facility_type(client, message, month, date, facility_type,
 
     buttons = []
     if page > 1:
-        buttons.append(
-            InlineKeyboardButton(
-                "⬅️ Previous",
-                callback_data=f"fp_{month}_{date.replace(' ', '_')}_{facility_type}_{page - 1}",
-            )
-        )
+        buttons.append(booking_button("⬅️ Previous", {**context, "page": page - 1}))
     if end_index < len(bookings):
-        buttons.append(
-            InlineKeyboardButton(
-                "➡️ Next",
-                callback_data=f"fp_{month}_{date.replace(' ', '_')}_{facility_type}_{page + 1}",
-            )
-        )
-    buttons.append(
-        InlineKeyboardButton(
-            "🔙 Back to Facility Types",
-            callback_data=f"d_{month}_{date.replace(' ', '_')}",
+        buttons.append(booking_button("➡️ Next", {**context, "page": page + 1}))
+    buttons.append(booking_button("🔙 Back to Facility Types", context["parent"]))
+
+    reply_markup = InlineKeyboardMarkup([buttons])
+    await show_screen(message, message_text, reply_markup=reply_markup)
+
+async def handle_view_bookings(client, callback_query):
+    bookings_by_month = await run_sheets(get_oc_bookings)
+    await show_oc_booking_months(client, callback_query.message, bookings_by_month)
+
+async def handle_booking_navigation(callback_query, data):
+    """Open the booking screen a bk_ button stands for, from the slice saved when the button was made."""
+    context = callback_tokens.resolve(data[len("bk_") :])
+    if context is None:
+        await callback_query.message.reply_text(
+            "❌ This menu has expired. Please open View Bookings again.",
+            reply_markup=InlineKeyboardMarkup(
+                [[InlineKeyboardButton("📚 View Bookings", callback_data="view_bookings")]]
+            ),
         )
+        return
+
+    if context["view"] == "dates":
+        await show_oc_booking_dates(app, callback_query.message, context)
+    elif context["view"] == "facility_types":
+        await show_oc_booking_facility_types(app, callback_query.message, context)
+    else:
+        await show_bookings_for_facility_type(app, callback_query.message, context)
+
+# Media Registry
+# One row per local file: its content hash, size, mtime and the Telegram file_id of its upload.
+# It lives in the state database so every worker reuses an upload made by any of them.
+with state_db_lock:
+    state_db.execute(
+        "CREATE TABLE IF NOT EXISTS media_registry ("
+        "path TEXT PRIMARY KEY, sha256 TEXT NOT NULL, size INTEGER NOT NULL, mtime REAL NOT NULL, file_id TEXT)"
     )
+    state_db.commit()
 
-    reply_markup = InlineKeyboardMarkup([buttons])
-    message.reply_text(message_text, reply_markup=reply_markup)
-
-def handle_view_dates(callback_query, data):
-    month = data[len("m_") :]
-    bookings_by_month = get_oc_bookings()
-    show_oc_booking_dates(app, callback_query.message, month, bookings_by_month)
-
-def handle_view_facility_types(callback_query, data):
-    parts = data.split("_")
-    month = parts[1]
-    date = parts[2].replace("_", " ")
-    bookings_by_month = get_oc_bookings()
-    show_oc_booking_facility_types(app, callback_query.message, month, date, bookings_by_month)
-
-def handle_view_facility_type(callback_query, data):
-    parts = data.split("_")
-    month = parts[1]
-    date = parts[2].replace("_", " ")
-    facility_type = parts[3]
-    page = int(parts[4]) if len(parts) > 4 else 1
-    bookings_by_month = get_oc_bookings()
-    show_bookings_for_facility_type(app, callback_query.message, month, date, facility_type, bookings_by_month, page)
+def load_media_registry():
+    """Copy the file_ids from the JSON registry kept by earlier versions into the table, if it is still there."""
+    try:
+        with open(MEDIA_REGISTRY_PATH, "r", encoding="utf-8") as file:
+            registry = json.load(file)
+    except FileNotFoundError:
+        return
+    except Exception as e:
+        print(f"Error loading media registry: {e}")
+        return
+    with state_db_lock:
+        state_db.executemany(
+            "INSERT OR IGNORE INTO media_registry (path, sha256, size, mtime, file_id) VALUES (?, ?, ?, ?, ?)",
+            [
+                (path, entry["sha256"], entry["size"], entry["mtime"], entry.get("file_id"))
+                for path, entry in registry.items()
+            ],
+        )
+        state_db.commit()
+    try:
+        os.remove(MEDIA_REGISTRY_PATH)
+    except FileNotFoundError:
+        pass
+
+def get_media_entry(path):
+    """Return the file's registry entry, or None if it has never been uploaded."""
+    with state_db_lock:
+        row = state_db.execute(
+            "SELECT sha256, size, mtime, file_id FROM media_registry WHERE path = ?", (path,)
+        ).fetchone()
+    if row is None:
+        return None
+    sha256, size, mtime, file_id = row
+    return {"sha256": sha256, "size": size, "mtime": mtime, "file_id": file_id}
+
+def save_media_entry(path, entry):
+    with state_db_lock:
+        state_db.execute(
+            "INSERT OR REPLACE INTO media_registry (path, sha256, size, mtime, file_id) VALUES (?, ?, ?, ?, ?)",
+            (path, entry["sha256"], entry["size"], entry["mtime"], entry["file_id"]),
+        )
+        state_db.commit()
+
+def file_sha256(path, entry):
+    """Return the file's SHA-256, reusing the entry's recorded hash while its size and mtime are unchanged."""
+    stat = os.stat(path)
+    if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+        return entry["sha256"], stat
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest(), stat
+
+async def send_cached_media(path, send, get_media):
+    """Send a local file by its recorded file_id, uploading it only the first time or after it changes.
+
+    send is called with either the file_id or the file path, and get_media picks the
+    uploaded document or photo out of the sent message.
+    """
+    entry = get_media_entry(path)
+    sha256, stat = await run_blocking(file_sha256, path, entry)
+    if entry and entry["sha256"] == sha256 and entry.get("file_id"):
+        try:
+            return await send(entry["file_id"])
+        except BadRequest as e:
+            # Telegram no longer accepts this file_id, so upload the file again
+            print(f"Error resending {path}: {e}")
+
+    sent = await send(path)
+    entry = {
+        "sha256": sha256,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "file_id": get_media(sent).file_id,
+    }
+    await run_blocking(save_media_entry, path, entry)
+    return sent
+
+async def reply_cached_document(message, path, **kwargs):
+    return await send_cached_media(path, lambda document: message.reply_document(document, **kwargs), lambda sent: sent.document)
+
+async def reply_cached_photo(message, path, **kwargs):
+    return await send_cached_media(path, lambda photo: message.reply_photo(photo, **kwargs), lambda sent: sent.photo)
 
 # Faci and Freshman Booklet
-def handle_view_booklets(callback_query):
+async def handle_view_booklets(callback_query):
     user_id = callback_query.from_user.id
     user_session = user_sessions.get(user_id)
     role = user_session.get("role")
@@ -628,115 +1511,216 @@ def handle_view_booklets(callback_query):
     Freshmen_booklet_path = "booklet/Official ICON FRESHIE HANDBOOK.pdf"
 
     if role == "Facilitator":
-        send_booklet(callback_query, facilitator_booklet_path, "Facilitator Handbook.pdf")
+        await send_booklet(callback_query, facilitator_booklet_path, "Facilitator Handbook.pdf")
     elif role == "Freshmen":
-        send_booklet(callback_query, Freshmen_booklet_path, "Freshman Handbook.pdf")
+        await send_booklet(callback_query, Freshmen_booklet_path, "Freshman Handbook.pdf")
     else:
-        callback_query.message.reply_text("❌ You do not have access to view booklets.")
+        await callback_query.message.reply_text("❌ You do not have access to view booklets.")
     
-def send_booklet(callback_query, booklet_path, new_file_name):
-    loading_message = callback_query.message.reply_text("📖 Retrieving booklet, please wait...")
+async def send_booklet(callback_query, booklet_path, new_file_name):
+    loading_message = await callback_query.message.reply_text("📖 Retrieving booklet, please wait...")
     try:
-        with open(booklet_path, "rb") as pdf_file:
-            keyboard = InlineKeyboardMarkup(
-                [
-                    [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]
-                ]
-            )
-            loading_message.delete()
-            callback_query.message.reply_document(pdf_file, file_name=new_file_name,reply_markup=keyboard )
+        keyboard = InlineKeyboardMarkup(
+            [
+                [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]
+            ]
+        )
+        await reply_cached_document(callback_query.message, booklet_path, file_name=new_file_name, reply_markup=keyboard)
+        await loading_message.delete()
     except FileNotFoundError:
-        loading_message.edit_text("❌ Booklet not found.")
+        await loading_message.edit_text("❌ Booklet not found.")
 
 
 # Club Information Functions
-def get_club_info(url, club_name):
-    """Scrape club information from the given URL."""
+club_info_cache = {}  # club name -> parsed page sections, saved icon path and HTTP validators
+club_cache_lock = threading.Lock()
+
+def club_display_name(club):
+    """Strip the flag emoji and brackets from a club entry, as shown in the club view."""
+    club_name = club.replace("(", " ").replace(")", " ")
+    return emoji.replace_emoji(club_name, replace='')
+
+# The club list keyboard is built at import, so its tokens are pinned
+for index, club in enumerate(clubs):
+    callback_tokens.pin(str(index), {"club_name": club_display_name(club)})
+
+def club_url(club_name):
+    return f"https://vivace.smu.edu.sg/explore/icon/{'-'.join(club_name.lower().split())}"
+
+def load_club_cache():
+    """Load the club cache saved by a previous run or by worker 0, if any."""
     try:
-        about_us = "About Us section not found"
-        key_events = "Key Events section not found"
-        icon_image = None
-
-        response = requests.get(url)
-        soup = BeautifulSoup(response.content, "html.parser")
-
-        # Extracting the icon URL
-        icon = soup.find("img", {"loading": "lazy"})
-        icon_url = icon["src"] if icon else None
-
-        # Check if icon_url is not None before concatenating
-        if icon_url:
-            icon_url = "https://vivace.smu.edu.sg" + icon_url
-            # Download the image if the icon URL is found
-            image_response = requests.get(icon_url)
-            if image_response.status_code == 200:
-                icon_image = Image.open(BytesIO(image_response.content))
-
-        # Extracting "About Us" section
-        if club_name == "SMU Francophiles":
-            with open("misc/francophiles.txt", "r") as file:
-                about_us = file.read().strip()
-        else:
-            about_us_section = soup.find(
-                "h2", string=lambda text: text and "ABOUT US" in text.upper()
-            )
-            if about_us_section:
-                parent_div = about_us_section.find_parent("div", class_="field_body")
-                paragraphs = parent_div.find_all("p") if parent_div else []
-                if paragraphs:
-                    about_us = "\n\n".join(f"📝 {p.get_text(strip=True)}" for p in paragraphs)
-                else:
-                    # Handle case with only one paragraph
-                    single_paragraph = about_us_section.find_next("p")
-                    about_us = (
-                        f"📝 {single_paragraph.get_text(strip=True)}"
-                        if single_paragraph
-                        else about_us
-                    )
+        with open(CLUB_CACHE_PATH, "r", encoding="utf-8") as file:
+            club_info_cache.update(json.load(file))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error loading club cache: {e}")
+
+def save_club_cache():
+    """Write the club cache to disk, replacing the old file in one step."""
+    with club_cache_lock:
+        temp_path = CLUB_CACHE_PATH + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(club_info_cache, file, ensure_ascii=False)
+        os.replace(temp_path, CLUB_CACHE_PATH)
+
+def conditional_get(url, etag=None, last_modified=None):
+    """GET the URL, letting the server answer 304 Not Modified if our copy is current."""
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return timed_api_call(
+        "http", urlparse(url).netloc, "get", requests.get, url, headers=headers, timeout=CLUB_REQUEST_TIMEOUT
+    )
+
+def parse_club_page(content, url, club_name):
+    """Extract the icon URL, About Us and Key Events sections from a club page."""
+    about_us = "About Us section not found"
+    key_events = "Key Events section not found"
+
+    soup = BeautifulSoup(content, "html.parser")
+
+    # Extracting the icon URL
+    icon = soup.find("img", {"loading": "lazy"})
+    icon_url = "https://vivace.smu.edu.sg" + icon["src"] if icon else None
 
-        # Extracting "Key Events" section
-        key_events_section = soup.find(
-            "h2", string=lambda text: text and "KEY EVENTS" in text.upper()
+    # Extracting "About Us" section
+    if club_name == "SMU Francophiles":
+        with open("misc/francophiles.txt", "r") as file:
+            about_us = file.read().strip()
+    else:
+        about_us_section = soup.find(
+            "h2", string=lambda text: text and "ABOUT US" in text.upper()
         )
-        if key_events_section:
-            parent_div = key_events_section.find_parent("div", class_="field_body")
-            list_items = parent_div.find_all("li") if parent_div else []
-            key_events_list = []
-            for li in list_items:
-                header = li.find("u")
-                if header:
-                    header_text = header.get_text(strip=True)
-                    key_events_list.append(f"• {header_text}")
-            key_events = "\n".join(key_events_list)
-            if key_events_list:
-                key_events += f"\n\nFor more information, please visit the club at {url}"
+        if about_us_section:
+            parent_div = about_us_section.find_parent("div", class_="field_body")
+            paragraphs = parent_div.find_all("p") if parent_div else []
+            if paragraphs:
+                about_us = "\n\n".join(f"📝 {p.get_text(strip=True)}" for p in paragraphs)
+            else:
+                # Handle case with only one paragraph
+                single_paragraph = about_us_section.find_next("p")
+                about_us = (
+                    f"📝 {single_paragraph.get_text(strip=True)}"
+                    if single_paragraph
+                    else about_us
+                )
 
-        return {
-            "icon_image": icon_image,
+    # Extracting "Key Events" section
+    key_events_section = soup.find(
+        "h2", string=lambda text: text and "KEY EVENTS" in text.upper()
+    )
+    if key_events_section:
+        parent_div = key_events_section.find_parent("div", class_="field_body")
+        list_items = parent_div.find_all("li") if parent_div else []
+        key_events_list = []
+        for li in list_items:
+            header = li.find("u")
+            if header:
+                header_text = header.get_text(strip=True)
+                key_events_list.append(f"• {header_text}")
+        key_events = "\n".join(key_events_list)
+        if key_events_list:
+            key_events += f"\n\nFor more information, please visit the club at {url}"
+
+    return icon_url, about_us, key_events
+
+def fetch_club_info(url, club_name):
+    """Refresh one club's cache entry with conditional GETs and return it."""
+    cached = club_info_cache.get(club_name, {})
+
+    response = conditional_get(url, cached.get("page_etag"), cached.get("page_last_modified"))
+    if response.status_code == 304 and cached:
+        entry = dict(cached)
+    else:
+        response.raise_for_status()
+        icon_url, about_us, key_events = parse_club_page(response.content, url, club_name)
+        entry = {
             "about_us": about_us,
             "key_events": key_events,
+            "icon_url": icon_url,
+            "page_etag": response.headers.get("ETag"),
+            "page_last_modified": response.headers.get("Last-Modified"),
         }
+        if icon_url == cached.get("icon_url"):
+            for key in ("icon_path", "icon_etag", "icon_last_modified"):
+                entry[key] = cached.get(key)
+
+    if entry["icon_url"]:
+        icon_image_path = f"clubs/{club_name}_logo.png"
+        have_icon = entry.get("icon_path") and os.path.exists(entry["icon_path"])
+        image_response = conditional_get(
+            entry["icon_url"],
+            entry.get("icon_etag") if have_icon else None,
+            entry.get("icon_last_modified") if have_icon else None,
+        )
+        if image_response.status_code == 200:
+            # Decode once here and keep the PNG on disk for every later view; the temp file is
+            # named for this process so workers that miss on the same club never share it
+            temp_path = f"{icon_image_path}.{os.getpid()}.tmp"
+            Image.open(BytesIO(image_response.content)).save(temp_path, format="PNG")
+            os.replace(temp_path, icon_image_path)
+            entry["icon_path"] = icon_image_path
+            entry["icon_etag"] = image_response.headers.get("ETag")
+            entry["icon_last_modified"] = image_response.headers.get("Last-Modified")
+        elif image_response.status_code != 304:
+            entry["icon_path"] = None
+    else:
+        entry["icon_path"] = None
+
+    with club_cache_lock:
+        club_info_cache[club_name] = entry
+    return entry
+
+def get_club_info(url, club_name):
+    """Return club information from the cache, scraping the club page only on a cache miss."""
+    info = club_info_cache.get(club_name)
+    if info is not None:
+        return info
+    try:
+        info = fetch_club_info(url, club_name)
+        if WORKER_INDEX == 0:
+            save_club_cache()
+        return info
     except Exception as e:
         print(f"Error fetching club info: {e}")
         return {
-            "icon_image": None,
+            "icon_path": None,
             "about_us": "Error fetching About Us.",
             "key_events": "Error fetching Key Events.",
         }
 
-def handle_view_club(callback_query, data):
-
-    club_name = (
-        data[len("club_") :].replace("_", " ").replace("(", " ").replace(")", " ")
-    )
-    club_name = emoji.replace_emoji(club_name,replace ='')
-    # print(f"club name: {club_name}")
-    url = f"https://vivace.smu.edu.sg/explore/icon/{'-'.join(club_name.lower().split())}"
+def prefetch_club_info():
+    """Refresh every club's cache entry concurrently with a bounded pool."""
+    def refresh(club):
+        club_name = club_display_name(club)
+        try:
+            fetch_club_info(club_url(club_name), club_name)
+        except Exception as e:
+            print(f"Error prefetching {club_name}: {e}")
+
+    with ThreadPoolExecutor(max_workers=CLUB_PREFETCH_WORKERS) as pool:
+        list(pool.map(refresh, clubs))
+    save_club_cache()
+
+async def handle_view_club(callback_query, data):
+    context = callback_tokens.resolve(data[len("club_") :])
+    if context is None:
+        await callback_query.message.reply_text("❌ Club not found.", reply_markup=CLUB_LIST_KEYBOARD)
+        return
+    club_name = context["club_name"]
+    url = club_url(club_name)
 
-    # Inform the user that data is being retrieved
-    loading_message = callback_query.message.reply_text("Retrieving data, please wait...")
+    info = club_info_cache.get(club_name)
+    loading_message = None
+    if info is None:
+        # Only a cache miss has to wait on the club website
+        loading_message = await callback_query.message.reply_text("Retrieving data, please wait...")
+        info = await run_blocking(get_club_info, url, club_name)
 
-    info = get_club_info(url, club_name)
     response_message = (
         f"ℹ️ {club_name} Info:\n\n"
         f"**__About Us:__**\n{info['about_us']}\n\n"
@@ -753,210 +1737,674 @@ def handle_view_club(callback_query, data):
     buttons = [[InlineKeyboardButton("🔙 Back to Club Menu", callback_data="explore_clubs")]]
     reply_markup = InlineKeyboardMarkup(buttons)
 
-    if info["icon_image"]:
-        # Save the image to a file
-        icon_image_path = f"clubs/{club_name}_logo.png"
-        info["icon_image"].save(icon_image_path)
-
-        # Send the image along with the message
-        loading_message.delete()
-        callback_query.message.reply_photo(
-            photo=icon_image_path, caption=response_message, reply_markup=reply_markup
+    icon_image_path = info.get("icon_path")
+    if loading_message:
+        await loading_message.delete()
+    if icon_image_path and os.path.exists(icon_image_path):
+        # Send the cached image along with the message
+        await reply_cached_photo(
+            callback_query.message, icon_image_path, caption=response_message, reply_markup=reply_markup
         )
     else:
-        loading_message.edit_text(response_message)
-        callback_query.message.reply_text(response_message, reply_markup=reply_markup)
+        await callback_query.message.reply_text(response_message, reply_markup=reply_markup)
 
-def show_club_list(client, message):
+async def show_club_list(client, message):
     """Display the club list menu."""
-    keyboard = InlineKeyboardMarkup(
-        [
-            [InlineKeyboardButton(club, callback_data=f"club_{club.replace(' ', '_')}")]
-            for club in clubs
-        ]
-        + [[InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]]
-    )
-    message.reply_text("❤️ **Select A Club To View**", reply_markup=keyboard)
+    await show_screen(message, "❤️ **Select A Club To View**", reply_markup=CLUB_LIST_KEYBOARD)
 
 # Attendance Matters
-def handle_early_check_out(loading_message, text):
+async def handle_early_check_out(loading_message, text):
     parts = text.split(",")
     if len(parts) != 3:
-        loading_message.edit_text(
+        await loading_message.edit_text(
             "❌ Please send the details in the correct format: \n**User ID, Expected Return Date and Time, Reason.**\n\nExample: 0XXXXXXX, 12/8 5:30 PM, Tuition."
         )
         return
 
     id, expected_return, reason = map(str.strip, parts)
     if not is_valid_id(id):
-        loading_message.edit_text("❌ Please submit a valid ID for early check out.")
+        await loading_message.edit_text("❌ Please submit a valid ID for early check out.")
         return
 
     additional_data = {
         "expected_return": expected_return,
         "reason": reason,
     }
-    update_google_sheet_for_action(loading_message, [id], "early_check_out", additional_data)
+    await update_google_sheet_for_action(loading_message, [id], "early_check_out", additional_data)
 
-def handle_default_action(loading_message, text, action, role):
+async def handle_default_action(loading_message, text, action, role):
     ids = text.split()
     if not all(is_valid_id(id) for id in ids):
-        loading_message.edit_text("❌ Please ensure all IDs are 8 digits long, start with 0, and are separated by spaces for multiple IDs.")
+        await loading_message.edit_text("❌ Please ensure all IDs are 8 digits long, start with 0, and are separated by spaces for multiple IDs.")
         return
 
-    update_google_sheet_for_action(loading_message, ids, action)
+    await update_google_sheet_for_action(loading_message, ids, action)
 
 def is_valid_id(id):
     return len(id) == 8 and id.isdigit() and id.startswith("0")
 
-def update_google_sheet_for_action(loading_message, ids, action, additional_data=None):
-    valid, validation_msg = validate_ids(ids)
+async def update_google_sheet_for_action(loading_message, ids, action, additional_data=None):
+    valid, validation_msg = await run_sheets(validate_ids, ids)
     if not valid:
-        loading_message.edit_text(validation_msg)
+        await loading_message.edit_text(validation_msg)
+        return
+
+    if action == "registration":
+        if WORKER_COUNT > 1:
+            load_registered_ids()
+        already_registered_ids = [id for id in ids if id in registered_ids]
+        if already_registered_ids:
+            await loading_message.edit_text(
+                f"❌ The following ID(s) has / have already been registered:\n" + "\n".join(already_registered_ids)
+            )
+            return
+
+    # The submission is safe on local disk once journaled; the replayer writes it to the sheets
+    journal_attendance(loading_message.chat.id, ids, action, additional_data)
+    _, msg = attendance_result(ids, action)
+    await loading_message.edit_text(f"{msg}\n\n🕒 Syncing to the sheet. You will be messaged if it fails.")
+
+    user_states.pop(loading_message.chat.id, None)  # Remove state
+    await show_submit_menu(app, loading_message, user_sessions.get(loading_message.chat.id).get("role"))
+
+# Attendance Import
+XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+XLSX_RELATIONSHIP_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+XLSX_PACKAGE_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+def xlsx_column_index(reference):
+    """Turn a cell reference such as "C12" into the zero-based column index 2."""
+    index = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - ord("A") + 1
+    return index - 1
+
+def xlsx_first_sheet_path(workbook):
+    """Return the path inside the archive of the workbook's first worksheet."""
+    sheet = ElementTree.fromstring(workbook.read("xl/workbook.xml")).find(f"{XLSX_NS}sheets/{XLSX_NS}sheet")
+    relationship_id = sheet.get(f"{XLSX_RELATIONSHIP_NS}id")
+    for relationship in ElementTree.fromstring(workbook.read("xl/_rels/workbook.xml.rels")):
+        if relationship.get("Id") == relationship_id:
+            target = relationship.get("Target")
+            return target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+    raise KeyError(relationship_id)
+
+def read_xlsx_rows(content):
+    """Yield the rows of an XLSX file's first worksheet, reading the sheet XML with the standard library.
+
+    Text cells come back as str and numbers as float, so IDs stored as numbers can have
+    their leading zero restored. Rows missing from the file are yielded empty, keeping row
+    numbers in line with the spreadsheet.
+    """
+    try:
+        with zipfile.ZipFile(BytesIO(content)) as workbook:
+            shared_strings = []
+            if "xl/sharedStrings.xml" in workbook.namelist():
+                root = ElementTree.fromstring(workbook.read("xl/sharedStrings.xml"))
+                shared_strings = [
+                    "".join(text.text or "" for text in item.iter(f"{XLSX_NS}t")) for item in root.iter(f"{XLSX_NS}si")
+                ]
+            number = 0
+            with workbook.open(xlsx_first_sheet_path(workbook)) as sheet:
+                # Stream the rows so a large sheet is never held in memory as a whole tree
+                for _, element in ElementTree.iterparse(sheet):
+                    if element.tag != f"{XLSX_NS}row":
+                        continue
+                    number += 1
+                    while number < int(element.get("r", number)):
+                        yield []
+                        number += 1
+                    row = []
+                    for cell in element.iter(f"{XLSX_NS}c"):
+                        index = xlsx_column_index(cell.get("r", "")) if cell.get("r") else len(row)
+                        row.extend([None] * (index - len(row) + 1))
+                        cell_type = cell.get("t")
+                        value = cell.findtext(f"{XLSX_NS}v")
+                        if cell_type == "s":
+                            row[index] = shared_strings[int(value)]
+                        elif cell_type == "inlineStr":
+                            row[index] = "".join(text.text or "" for text in cell.iter(f"{XLSX_NS}t"))
+                        elif cell_type in ("str", "e"):
+                            row[index] = value
+                        elif cell_type == "b":
+                            row[index] = "TRUE" if value == "1" else "FALSE"
+                        elif value is not None:
+                            row[index] = float(value)
+                    element.clear()
+                    yield row
+    except (KeyError, IndexError, AttributeError, ElementTree.ParseError) as e:
+        raise ValueError(f"this is not a readable XLSX workbook ({e})")
+
+def read_attendance_rows(file_name, content):
+    """Yield each row of an uploaded CSV or XLSX file as a list of stripped strings."""
+    if file_name.lower().endswith(".xlsx"):
+        for row in read_xlsx_rows(content):
+            yield [normalize_import_cell(value) for value in row]
+    else:
+        with io.TextIOWrapper(BytesIO(content), encoding="utf-8-sig", newline="") as text:
+            for row in csv.reader(text):
+                yield [normalize_import_cell(value) for value in row]
+
+def normalize_import_cell(value):
+    """Turn a cell into text, restoring the leading zero spreadsheets drop from numeric IDs."""
+    if value is None:
+        return ""
+    if isinstance(value, (int, float)) and float(value).is_integer():
+        return str(int(value)).zfill(8)
+    return str(value).strip()
+
+def validate_attendance_import(rows, action):
+    """Check every row of an upload in one pass and return (ids, additional_data, errors).
+
+    Rows are rejected for a malformed or unknown ID, an ID repeated in the file, an ID that is
+    already registered (for registrations), or missing early check-out details. Blank rows are
+    skipped, and rows above the first one with a digit in its ID column are treated as titles
+    and headers.
+    """
+    if action == "registration" and WORKER_COUNT > 1:
+        load_registered_ids()
+    ids = []
+    check_out_rows = {}
+    errors = []
+    seen = set()
+    unknown = []
+    in_header = True
+    for number, row in enumerate(rows, start=1):
+        if not any(row):
+            continue
+        id = row[0]
+        if in_header and not any(char.isdigit() for char in id):
+            continue
+        in_header = False
+        if id.isdigit():
+            id = id.zfill(8)
+        if len(ids) + len(errors) >= IMPORT_MAX_ROWS:
+            errors.append((number, f"Rows {number} onwards: only {IMPORT_MAX_ROWS} rows can be imported at once"))
+            break
+        if not is_valid_id(id):
+            errors.append((number, f"Row {number}: {id or '(blank)'} is not an 8 digit ID starting with 0"))
+        elif id in seen:
+            errors.append((number, f"Row {number}: {id} appears more than once"))
+        elif action == "registration" and id in registered_ids:
+            errors.append((number, f"Row {number}: {id} has already been registered"))
+        elif action == "early_check_out" and (len(row) < 3 or not row[1] or not row[2]):
+            errors.append((number, f"Row {number}: {id} needs an expected return and a reason"))
+        else:
+            seen.add(id)
+            if id not in masterlist_by_id:
+                unknown.append((number, id))
+            ids.append(id)
+            if action == "early_check_out":
+                check_out_rows[id] = {"expected_return": row[1], "reason": row[2]}
+
+    if unknown and refresh_masterlist_index_on_miss():
+        unknown = [(number, id) for number, id in unknown if id not in masterlist_by_id]
+    unknown_ids = {id for _, id in unknown}
+    errors.extend((number, f"Row {number}: {id} is not in the Masterlist") for number, id in unknown)
+    ids = [id for id in ids if id not in unknown_ids]
+
+    additional_data = {"rows": {id: check_out_rows[id] for id in ids}} if action == "early_check_out" else None
+    return ids, additional_data, [error for _, error in sorted(errors)]
+
+async def reply_import_errors(loading_message, errors):
+    """Report every rejected row, as a text file if the list is too long for one message."""
+    report = "❌ These rows were not imported:\n\n" + "\n".join(errors)
+    if len(report) <= MAX_MESSAGE_LENGTH:
+        await loading_message.reply_text(report)
+        return
+    document = BytesIO(("\n".join(errors) + "\n").encode("utf-8"))
+    document.name = "rejected_rows.txt"
+    await loading_message.reply_document(document, caption=f"❌ {len(errors)} rows were not imported.")
+
+async def handle_attendance_import(client, message, action):
+    document = message.document
+    file_name = document.file_name or ""
+    if not file_name.lower().endswith((".csv", ".xlsx")):
+        await message.reply_text("❌ Please upload a .csv or .xlsx file.")
+        return
+    if document.file_size and document.file_size > IMPORT_MAX_BYTES:
+        await message.reply_text(f"❌ Please upload a file smaller than {IMPORT_MAX_BYTES // (1024 * 1024)} MB.")
+        return
+
+    loading_message = await message.reply_text("⏳ Importing... Please wait.")
+    content = (await client.download_media(message, in_memory=True)).getvalue()
+    try:
+        ids, additional_data, errors = await run_sheets(
+            lambda: validate_attendance_import(read_attendance_rows(file_name, content), action)
+        )
+    except (ValueError, UnicodeDecodeError, csv.Error, zipfile.BadZipFile) as e:
+        await loading_message.edit_text(f"❌ The file could not be read: {e}")
         return
 
-    future = executor.submit(update_google_sheet, ids, action, additional_data)
-    success, msg = future.result()
-    loading_message.edit_text(msg)
+    if ids:
+        # The whole file becomes one journal entry, so it is applied in a single batched write
+        journal_attendance(message.chat.id, ids, action, additional_data)
+        await loading_message.edit_text(
+            f"✅ {len(ids)} ID(s) from {file_name} recorded for {action.replace('_', ' ')}."
+            "\n\n🕒 Syncing to the sheet. You will be messaged if it fails."
+        )
+    else:
+        await loading_message.edit_text(f"❌ No rows from {file_name} could be imported.")
+    if errors:
+        await reply_import_errors(loading_message, errors)
 
-    if success:
-        user_states.pop(loading_message.chat.id, None)  # Remove state
-        show_submit_menu(app, loading_message, user_sessions.get(loading_message.chat.id).get("role"))
+    user_states.pop(message.chat.id, None)
+    await show_submit_menu(app, loading_message, user_sessions.get(message.chat.id).get("role"))
 
 # Google Sheet Update Functions
-def update_google_sheet(ids, action, additional_data=None):
-    acquire_lock()  # Acquire lock before updating the sheet
-    try:
-        start_row = 1
-        start_col = 2
-        current_time = datetime.now().strftime("%d %b %I:%M %p")
+def plan_attendance_writes(ids, action, additional_data, existing_ids, reg_existing_ids, current_time):
+    """Work out every cell change for one submission without calling the Sheets API.
+
+    existing_ids and reg_existing_ids are the column B values of the target sheet and of
+    the "Registration" sheet; they are extended in place as new rows are planned so that
+    repeated IDs land on the same row. Returns (sheet_updates, registration_updates) as
+    lists of (row, col, value).
+    """
+    start_row = 1
+    start_col = 2
+    sheet_updates = []
+    registration_updates = []
+
+    row_by_id = {}
+    for index, existing_id in enumerate(existing_ids):
+        row_by_id.setdefault(existing_id, index + start_row)
+    reg_ids = set(reg_existing_ids)
+
+    def find_or_append_row(id):
+        """Return the ID's row, reserving the next empty row if it is not in the sheet yet."""
+        if id in row_by_id:
+            return row_by_id[id]
+        next_row = len(existing_ids) + start_row
+        existing_ids.append(id)
+        row_by_id[id] = next_row
+        sheet_updates.append((next_row, start_col, id))  # Column B
+        return next_row
+
+    def ensure_registered(id):
+        """Add the ID to the "Registration" sheet if it is not already there."""
+        if id not in reg_ids:
+            next_reg_row = len(reg_existing_ids) + start_row
+            reg_existing_ids.append(id)
+            reg_ids.add(id)
+            registration_updates.append((next_reg_row, start_col, id))
+
+    if action == "registration":
+        for id in ids:
+            find_or_append_row(id)
+    elif action == "late_sign_in":
+        for id in ids:
+            # Update sign-in date and time for users who signed out early, or record new late sign-ins
+            row = find_or_append_row(id)
+            sheet_updates.append((row, 17, current_time))  # Column Q is the 17th column
+            ensure_registered(id)
+    elif action == "early_check_out" and additional_data:
+        for id in ids:
+            # Imported files carry details per ID; a chat submission shares one set
+            details = additional_data["rows"][id] if "rows" in additional_data else additional_data
+            row = find_or_append_row(id)
+            sheet_updates.append((row, 12, current_time))  # Column L
+            sheet_updates.append((row, 14, details["expected_return"]))  # Column N
+            sheet_updates.append((row, 15, details["reason"]))  # Column O
+            ensure_registered(id)
+
+    return sheet_updates, registration_updates
+
+def flush_cell_updates(sheet, updates):
+    """Send planned (row, col, value) changes to the sheet in a single batch_update call."""
+    if not updates:
+        return
+    sheet.batch_update(
+        [{"range": rowcol_to_a1(row, col), "values": [[value]]} for row, col, value in updates],
+        value_input_option="USER_ENTERED",
+    )
 
-        if action == "registration":
-            sheet = registration_sheet
-        else:
-            sheet = late_early_sheet
+def attendance_result(ids, action):
+    """Build the (success, message) reply for a submission that has been accepted."""
+    names = get_names(ids)
+    if action == "early_check_out":
+        return (
+            True,
+            "\n".join(
+                [
+                    f"✅ {id} {name} has successfully checked out of camp early.\n"
+                    for id, name in zip(ids, names)
+                ]
+            )
+            + "\nPlease don't forget to ask your freshie to rest up!",
+        )
+    elif action == "late_sign_in":
+        return (
+            True,
+            "\n".join(
+                [
+                    f"✅ {id} {name} has successfully checked into camp.\n"
+                    for id, name in zip(ids, names)
+                ]
+            )
+            + "\nGo forth and seize the day, fellow adventurers!",
+        )
+    return (
+        True,
+        "✅ The following ID(s) and name(s) has / have been recorded successfully:\n\n"
+        + "\n".join([f"{id} - {name}" for id, name in zip(ids, names)]),
+    )
 
-        existing_ids = sheet.col_values(start_col)
+def parse_submitted_at(value):
+    try:
+        return datetime.strptime(value, SUBMITTED_AT_FORMAT)
+    except ValueError:
+        return None
+
+def checked_out_ids(rows):
+    """Return the IDs on the check-out sheet whose early check-out is later than their last sign-in."""
+    checked_out = set()
+    for row in rows:
+        row = row + [""] * (17 - len(row))
+        id, check_out, sign_in = row[1], row[11], row[16]  # Columns B, L and Q
+        if not check_out:
+            continue
+        check_out_time, sign_in_time = parse_submitted_at(check_out), parse_submitted_at(sign_in)
+        if check_out_time and sign_in_time:
+            if sign_in_time < check_out_time:
+                checked_out.add(id)
+        elif not sign_in:
+            checked_out.add(id)
+    return checked_out
+
+def apply_attendance_batch(mutations):
+    """Apply journaled attendance mutations with one column read and one batched write per sheet.
+
+    Mutations are planned in journal order against shared copies of column B, so later
+    submissions see the rows reserved by earlier ones. Returns one (success, error) result
+    per mutation, where error is None for a mutation that was written.
+    """
+    registration_sheet = get_worksheet("registration")
+    late_early_sheet = get_worksheet("late_early")
+    reg_existing_ids = registration_sheet.col_values(2)
+    registration_sheet_ids.update(reg_existing_ids)
+    registered_ids.update(reg_existing_ids)
+    if any(mutation["action"] != "registration" for mutation in mutations):
+        late_rows = late_early_sheet.get_all_values()
+    else:
+        late_rows = []
+    late_existing_ids = [row[1] if len(row) > 1 else "" for row in late_rows]
+    checked_out = checked_out_ids(late_rows)
+
+    registration_updates = []
+    late_early_updates = []
+    departures = []
+    returns = []
+    planned = []
+    for mutation in mutations:
+        ids = mutation["ids"]
+        action = mutation["action"]
         if action == "registration":
-            already_registered_ids = [id for id in ids if id in existing_ids]
-            if already_registered_ids:
-                return (
-                    False,
-                    f"❌ The following ID(s) has / have already been registered:\n"
-                    + "\n".join(already_registered_ids),
-                )
-            for id in ids:
-                next_row = len(existing_ids) + start_row
-                sheet.update_cell(next_row, start_col, id)
-                existing_ids.append(id)
-        elif action == "late_sign_in":
-            for id in ids:
-                if id in existing_ids:
-                    # Update sign-in date and time for users who signed out early
-                    cell = sheet.find(id)
-                    row = cell.row
-                    sheet.update_cell(
-                        row, 17, current_time
-                    )  # Column Q is the 17th column
-                else:
-                    # Record new late sign-ins
-                    next_row = len(existing_ids) + start_row
-                    sheet.update_cell(next_row, start_col, id)  # Column B
-                    sheet.update_cell(next_row, 17, current_time)  # Column Q
-                    existing_ids.append(id)
-                # Check if the ID exists in the "Registration" sheet
-                reg_existing_ids = registration_sheet.col_values(2)
-                if id not in reg_existing_ids:
-                    next_reg_row = len(reg_existing_ids) + start_row
-                    registration_sheet.update_cell(next_reg_row, start_col, id)
-        elif action == "early_check_out" and additional_data:
-            for id in ids:
-                if id in existing_ids:
-                    # Update existing entry for early check-out
-                    cell = sheet.find(id)
-                    row = cell.row
-                    sheet.update_cell(row, 12, current_time)  # Column L
-                    sheet.update_cell(
-                        row, 14, additional_data["expected_return"]
-                    )  # Column N
-                    sheet.update_cell(row, 15, additional_data["reason"])  # Column O
-                else:
-                    # Record new early check-out
-                    next_row = len(existing_ids) + start_row
-                    sheet.update_cell(next_row, start_col, id)  # Column B
-                    sheet.update_cell(next_row, 12, current_time)  # Column L
-                    sheet.update_cell(
-                        next_row, 14, additional_data["expected_return"]
-                    )  # Column N
-                    sheet.update_cell(
-                        next_row, 15, additional_data["reason"]
-                    )  # Column O
-                    existing_ids.append(id)
-                # Check if the ID exists in the "Registration" sheet
-                reg_existing_ids = registration_sheet.col_values(2)
-                if id not in reg_existing_ids:
-                    next_reg_row = len(reg_existing_ids) + start_row
-                    registration_sheet.update_cell(next_reg_row, start_col, id)
-        names = get_names(ids)
-        if action == "early_check_out":
-            return (
-                True,
-                "\n".join(
-                    [
-                        f"✅ {id} {name} has successfully checked out of camp early.\n"
-                        for id, name in zip(ids, names)
-                    ]
+            registered_in_sheet = set(reg_existing_ids)
+            already_registered_ids = [id for id in ids if id in registered_in_sheet]
+            # IDs found on a retry were written by this entry's own earlier attempt
+            if already_registered_ids and not mutation["attempts"]:
+                planned.append(
+                    (
+                        False,
+                        f"❌ The following ID(s) has / have already been registered:\n"
+                        + "\n".join(already_registered_ids),
+                    )
                 )
-                + "\nPlease don't forget to ask your freshie to rest up!",
+                continue
+            sheet_updates, _ = plan_attendance_writes(
+                ids, action, None, reg_existing_ids, [], mutation["submitted_at"]
             )
-        elif action == "late_sign_in":
-            return (
-                True,
-                "\n".join(
-                    [
-                        f"✅ {id} {name} has successfully checked into camp.\n"
-                        for id, name in zip(ids, names)
-                    ]
-                )
-                + "\nGo forth and seize the day, fellow adventurers!",
+            registration_updates.extend(sheet_updates)
+        else:
+            sheet_updates, reg_updates = plan_attendance_writes(
+                ids, action, mutation["additional_data"], late_existing_ids, reg_existing_ids, mutation["submitted_at"]
             )
-        return (
-            True,
-            "✅ The following ID(s) and name(s) has / have been recorded successfully:\n\n"
-            + "\n".join([f"{id} - {name}" for id, name in zip(ids, names)]),
+            late_early_updates.extend(sheet_updates)
+            registration_updates.extend(reg_updates)
+            # Leaving early stops counting as present until the next sign-in
+            for id in ids:
+                if action == "early_check_out" and sheet_updates and id not in checked_out:
+                    checked_out.add(id)
+                    departures.append(id)
+                elif action == "late_sign_in" and id in checked_out:
+                    checked_out.discard(id)
+                    returns.append(id)
+        planned.append(None)
+
+    flush_cell_updates(registration_sheet, registration_updates)
+    flush_cell_updates(late_early_sheet, late_early_updates)
+    # Every Registration change is a new ID in column B, i.e. someone newly present at camp
+    arrivals = [id for _, _, id in registration_updates]
+    registration_sheet_ids.update(arrivals)
+    record_strength_changes(arrivals + returns, departures)
+
+    return [result if result is not None else (True, None) for result in planned]
+
+# Attendance Journal
+with state_db_lock:
+    state_db.execute(
+        "CREATE TABLE IF NOT EXISTS attendance_journal ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, chat_id INTEGER NOT NULL, ids TEXT NOT NULL, "
+        "action TEXT NOT NULL, additional_data TEXT, submitted_at TEXT NOT NULL, created_at REAL NOT NULL, "
+        "status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, error TEXT, "
+        "failures INTEGER NOT NULL DEFAULT 0)"
+    )
+    try:
+        # Journals made before failures were counted apart from attempts
+        state_db.execute("ALTER TABLE attendance_journal ADD COLUMN failures INTEGER NOT NULL DEFAULT 0")
+    except sqlite3.OperationalError:
+        pass
+    state_db.execute("CREATE INDEX IF NOT EXISTS attendance_journal_status ON attendance_journal (status, id)")
+    state_db.commit()
+
+attendance_wakeup = queue.Queue()
+# IDs on the "Registration" sheet or journaled for it, so duplicate registrations are caught without a Sheets read
+registered_ids = set()
+registration_sheet_ids = set()  # IDs seen in column B of "Registration" by this process
+
+def load_journaled_ids():
+    """Return the IDs of journal entries that have not failed; each action adds its IDs to Registration."""
+    with state_db_lock:
+        rows = state_db.execute("SELECT ids FROM attendance_journal WHERE status != 'failed'").fetchall()
+    return set().union(*(json.loads(ids) for ids, in rows))
+
+def load_registered_ids():
+    """Rebuild registered_ids from the sheet IDs seen here and the journal entries that have not failed.
+
+    With several workers this picks up the submissions the others have journaled and drops
+    the ones the writer has since marked failed.
+    """
+    global registered_ids
+    registered_ids = registration_sheet_ids | load_journaled_ids()
+
+load_registered_ids()
+
+def refresh_registered_ids():
+    """Add the IDs already on the "Registration" sheet, so duplicates made outside the bot are caught too."""
+    sheet_ids = get_worksheet("registration").col_values(2)
+    registration_sheet_ids.update(sheet_ids)
+    registered_ids.update(sheet_ids)
+
+def journal_attendance(chat_id, ids, action, additional_data=None):
+    """Durably record a validated submission, stamped with the time it was made, and wake the replayer."""
+    submitted_at = datetime.now().strftime(SUBMITTED_AT_FORMAT)
+    with state_db_lock:
+        cursor = state_db.execute(
+            "INSERT INTO attendance_journal (chat_id, ids, action, additional_data, submitted_at, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (chat_id, json.dumps(ids), action, json.dumps(additional_data), submitted_at, time.time()),
         )
-    finally:
-        release_lock()  # Release lock after updating the sheet
+        state_db.commit()
+    registered_ids.update(ids)
+    attendance_wakeup.put(cursor.lastrowid)
+    return cursor.lastrowid
+
+def load_pending_attendance(limit):
+    """Return up to limit pending journal entries, oldest first, as mutations for apply_attendance_batch."""
+    with state_db_lock:
+        rows = state_db.execute(
+            "SELECT id, chat_id, ids, action, additional_data, submitted_at, attempts, failures FROM attendance_journal "
+            "WHERE status = 'pending' ORDER BY id LIMIT ?",
+            (limit,),
+        ).fetchall()
+    return [
+        {
+            "entry_id": entry_id,
+            "chat_id": chat_id,
+            "ids": json.loads(ids),
+            "action": action,
+            "additional_data": json.loads(additional_data),
+            "submitted_at": submitted_at,
+            "attempts": attempts,
+            "failures": failures,
+        }
+        for entry_id, chat_id, ids, action, additional_data, submitted_at, attempts, failures in rows
+    ]
 
+def count_pending_attendance():
+    with state_db_lock:
+        return state_db.execute("SELECT COUNT(*) FROM attendance_journal WHERE status = 'pending'").fetchone()[0]
+
+def record_journal_attempt(entries):
+    with state_db_lock:
+        state_db.executemany(
+            "UPDATE attendance_journal SET attempts = attempts + 1 WHERE id = ?",
+            [(entry["entry_id"],) for entry in entries],
+        )
+        state_db.commit()
+
+def record_journal_failure(entry, e):
+    """Count a non-transient write failure against an entry, giving it up after JOURNAL_MAX_ATTEMPTS."""
+    with state_db_lock:
+        state_db.execute("UPDATE attendance_journal SET failures = failures + 1 WHERE id = ?", (entry["entry_id"],))
+        state_db.commit()
+    if entry["failures"] + 1 >= JOURNAL_MAX_ATTEMPTS:
+        finish_journal_entry(entry, "failed", str(e))
+        notify_attendance_failure(entry, sheets_error_message(e))
+
+def finish_journal_entry(entry, status, error=None):
+    """Mark an entry applied or failed.
+
+    A failed entry's IDs stop counting as registered, except those already on the sheet or
+    carried by another entry that has not failed.
+    """
+    with state_db_lock:
+        state_db.execute(
+            "UPDATE attendance_journal SET status = ?, error = ? WHERE id = ?", (status, error, entry["entry_id"])
+        )
+        state_db.commit()
+    if status == "failed":
+        still_registered = registration_sheet_ids | load_journaled_ids()
+        registered_ids.difference_update(set(entry["ids"]) - still_registered)
+
+def notify_attendance_failure(entry, reason):
+    """Tell the facilitator who made a submission that it could not be written to the sheet."""
+    action = entry["action"].replace("_", " ")
+    ids = entry["ids"]
+    # Imported files can hold hundreds of IDs, more than fit in one message
+    described_ids = ", ".join(ids) if len(ids) <= 20 else f"{len(ids)} IDs starting {', '.join(ids[:5])}"
+    send_message_from_thread(
+        entry["chat_id"],
+        f"❌ Your {action} for {described_ids} submitted at {entry['submitted_at']} "
+        f"could not be saved to the sheet:\n\n{reason}\n\nPlease submit it again.",
+    )
+
+def write_journal_entries(entries):
+    """Write entries to the sheets as one batch, then mark each applied, or failed if the sheet refused it."""
+    record_journal_attempt(entries)
+    try:
+        with sheets_priority(PRIORITY_ATTENDANCE):
+            results = apply_attendance_batch(entries)
+    finally:
+        # A later try must know this one may have reached the sheet before failing
+        for entry in entries:
+            entry["attempts"] += 1
+    for entry, (success, message) in zip(entries, results):
+        if success:
+            finish_journal_entry(entry, "applied")
+        else:
+            finish_journal_entry(entry, "failed", message)
+            notify_attendance_failure(entry, message)
+
+def replay_attendance_journal():
+    """Apply pending journal entries to the sheets in batches until none are left or Sheets fails.
+
+    Replays are idempotent: rows are found by Student ID and every cell is written with the
+    value recorded at submission, so an entry applied twice leaves the sheets unchanged.
+    Transient Sheets errors leave every entry pending, however long the outage lasts. Any
+    other error splits the batch so each entry is written on its own, and only an entry that
+    still fails counts it; after JOURNAL_MAX_ATTEMPTS such failures it is marked failed and
+    its submitter told. Returns False if a write failed.
+    """
+    while True:
+        entries = load_pending_attendance(ATTENDANCE_MAX_BATCH)
+        if not entries:
+            return True
+        try:
+            write_journal_entries(entries)
+        except Exception as e:
+            if is_transient_sheets_error(e):
+                print(f"Error replaying attendance journal, will retry: {e}")
+                return False
+            if len(entries) == 1:
+                print(f"Error replaying journal entry {entries[0]['entry_id']}: {e}")
+                record_journal_failure(entries[0], e)
+                return False
+            print(f"Error replaying attendance journal, writing entries one at a time: {e}")
+            # One bad entry must not hold back the valid ones batched with it
+            for entry in entries:
+                try:
+                    write_journal_entries([entry])
+                except Exception as e:
+                    if is_transient_sheets_error(e):
+                        print(f"Error replaying attendance journal, will retry: {e}")
+                        return False
+                    print(f"Error replaying journal entry {entry['entry_id']}: {e}")
+                    record_journal_failure(entry, e)
+            return False
+
+def attendance_writer():
+    """Replay the journal as submissions arrive, backing off while writes keep failing.
+
+    After a failed replay the next one waits JOURNAL_RETRY_INTERVAL, doubled after each
+    further failure up to JOURNAL_RETRY_CAP. Other workers cannot wake this thread, so with
+    several workers the journal is also polled every JOURNAL_POLL_INTERVAL while Sheets is healthy.
+    """
+    failures = 0
+    while True:
+        if not replay_attendance_journal():
+            failures += 1
+            # Submissions made meanwhile stay in the journal until the backoff ends
+            time.sleep(min(JOURNAL_RETRY_CAP, JOURNAL_RETRY_INTERVAL * 2 ** (failures - 1)))
+            continue
+        failures = 0
+        timeout = JOURNAL_POLL_INTERVAL if WORKER_COUNT > 1 else JOURNAL_RETRY_INTERVAL
+        try:
+            attendance_wakeup.get(timeout=timeout)
+        except queue.Empty:
+            continue
+        # Submissions that arrive together are replayed as one batch
+        while True:
+            try:
+                attendance_wakeup.get_nowait()
+            except queue.Empty:
+                break
 
 # Essential Links
-def show_essential_links(client, message):
+async def show_essential_links(client, message):
     """Display the list of essential links."""
-    links_message = "🔗 **Essential Links** 🔗\n\n"
-    for name, url in essential_links:
-        links_message += f"[{name}]({url})\n"
-
-    keyboard = InlineKeyboardMarkup(
-        [[InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]]
+    await show_screen(
+        message, ESSENTIAL_LINKS_MESSAGE, reply_markup=BACK_TO_MAIN_MENU_KEYBOARD, disable_web_page_preview=True
     )
 
-    message.reply_text(links_message, reply_markup=keyboard, disable_web_page_preview=True)
-
 # Clan Menu
-def show_clans_menu(client, message):
+async def show_clans_menu(client, message):
     """Display the clans menu."""
-    keyboard = InlineKeyboardMarkup(
-        [
-            [InlineKeyboardButton("Merliosa", callback_data="clan_merliosa")],
-            [InlineKeyboardButton("Durio", callback_data="clan_durio")],
-            [InlineKeyboardButton("Orchidium", callback_data="clan_orchidium")],
-            [InlineKeyboardButton("Quilapius", callback_data="clan_quilapius")],
-            [InlineKeyboardButton("🔙 Back to Login Menu", callback_data="login_menu")],
-        ]
-    )
-    message.reply_text("🔸 Select A Clan To View:", reply_markup=keyboard)
+    await show_screen(message, "🔸 Select A Clan To View:", reply_markup=CLANS_MENU_KEYBOARD)
 
-def handle_clan_selection(callback_query, clan):
+async def handle_clan_selection(callback_query, clan):
     """Handle the selection of a clan and send the corresponding PNG."""
     png_files = {
         "merliosa": "clan/merliosa.png",
@@ -967,15 +2415,16 @@ def handle_clan_selection(callback_query, clan):
     png_file = png_files.get(clan)
 
     if png_file and os.path.exists(png_file):
-        callback_query.message.reply_photo(
-            photo=open(png_file, "rb"),
+        await reply_cached_photo(
+            callback_query.message,
+            png_file,
             caption=f"Welcome to Clan {clan.capitalize()}!",
             reply_markup=InlineKeyboardMarkup(
                 [[InlineKeyboardButton("🔙 Back to Clans", callback_data="clans")]]
             ),
         )
     else:
-        callback_query.message.reply_text(
+        await callback_query.message.reply_text(
             "❌ Error 404 not found.",
             reply_markup=InlineKeyboardMarkup(
                 [[InlineKeyboardButton("🔙 Back to Clans", callback_data="clans")]]
@@ -983,148 +2432,45 @@ def handle_clan_selection(callback_query, clan):
         )
 
 # Menu Display Functions
-def show_login_menu(client, message):
+async def show_login_menu(client, message):
     """Display the main menu."""
-    keyboard = InlineKeyboardMarkup(
-        [
-            [InlineKeyboardButton("🔐 Login", callback_data="login")],
-            [InlineKeyboardButton("🔰 Clans", callback_data="clans")],
-        ]
-    )
-    message.reply_text("🔸 Please log in to continue:", reply_markup=keyboard)
+    await show_screen(message, "🔸 Please log in to continue:", reply_markup=LOGIN_MENU_KEYBOARD)
 
 def clear_user_state(user_id):
     """Clear the user state."""
     if user_id in user_states:
         del user_states[user_id]
 
-def show_menu_and_clear_state(client, message, user_id):
+async def show_menu_and_clear_state(client, message, user_id):
     clear_user_state(user_id)
-    show_menu(client, message)
+    await show_menu(client, message)
 
 
-def show_menu(client, message):
-    # print(message)
+async def show_menu(client, message):
     user_id = message.chat.id
-    # print(f"USER ID: {user_id}")
     user_session = user_sessions.get(user_id)
-    # print("IM showing menu!!!")
     if not user_session:
-        message.reply_text("❌ Access denied. Please login by pressing /start to continue.")
+        await message.reply_text("❌ Access denied. Please login by pressing /start to continue.")
         return
-    role = user_session.get("role")
-    # subclan = user_session.get("subclan")
-    keyboard = []
+    reply_markup = get_main_menu_keyboard(user_session.get("role"))
+    await show_screen(message, " 🤩 **Please Choose An Action:**", reply_markup=reply_markup)
 
-    # Add OC specific options
-    if role in ["OC"]:
-        keyboard.append(
-            [
-                    InlineKeyboardButton("📚 View Bookings", callback_data="view_bookings")
-            ]
-        )
-        
-    if role in ["OC", "Game Master"]:
-        keyboard.append(
-            [
-                    InlineKeyboardButton("💪 Camp Strength", callback_data="show_strength")
-            ]
-        )
+async def show_points_matters(client, message):
+    await show_screen(message, "**👾 Points Matters**", reply_markup=POINTS_MATTERS_KEYBOARD)
 
-    # Add attendance tracking for Facilitator, Clanhead, OC roles
-    if role in ["Facilitator", "Clan Head", "OC", "Game Master"]:
-        keyboard.append([InlineKeyboardButton("✍️ Attendance", callback_data="submit_ids")])
-    if role in ["Facilitator", "Freshmen"]:
-        keyboard.append([InlineKeyboardButton("📖 Booklet", callback_data="view_booklets")])  # New option for Booklets
-    if role in ["Facilitator", "OC", "Clan Head"]:
-        keyboard.append(
-            [
-                InlineKeyboardButton("👾 Points Matters", callback_data="points_matters"),
-                InlineKeyboardButton("📅 View Schedule", callback_data="view_schedule"),
-            ],
-        )
-
-    # Add common options for all roles
-    common_options = [
-        [InlineKeyboardButton("📞 Important Contacts", callback_data="contact_person")],
-        [InlineKeyboardButton("☀️ Sentosa Guide", callback_data="sentosa_guide")],
-        [InlineKeyboardButton("❤️ SMU ICON Clubs", callback_data="explore_clubs"),
-         InlineKeyboardButton("🔗 Essential Links", callback_data="view_links")],
-        [InlineKeyboardButton("🍽 Food in SMU", callback_data="food_in_smu"),
-         InlineKeyboardButton("🗺️ Campus Map", callback_data="view_campus_map")],  # Added Food in SMU option
-        [InlineKeyboardButton("🚪Log Out", callback_data="exit")],
-    ]
-
-    keyboard.extend(common_options)
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    message.reply_text(" 🤩 **Please Choose An Action:**", reply_markup=reply_markup)
-
-def show_points_matters(client, message):
-    keyboard = InlineKeyboardMarkup(
-        [
-            [
-                InlineKeyboardButton(
-                    "📊 Retrieve Day 3 Credits",
-                    callback_data="get_d3_currency",
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    "📊 Retrieve Cumulative Subclan Points",
-                    callback_data="get_overall_subclan_points",
-                )
-            ],
-            [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")],
-        ]
-    )
-    message.reply_text("**👾 Points Matters**", reply_markup=keyboard)
-
-def show_submit_menu(client, message, role):
+async def show_submit_menu(client, message, role):
     """Display the submit menu."""
-    keyboard = []
-
-    if role in ["OC", "Game Master"]:
-        keyboard.append([InlineKeyboardButton("📝 Registration", callback_data="registration")])
-
-    keyboard.extend(
-        [
-            [InlineKeyboardButton("⏰ Late Sign In", callback_data="late_sign_in")],
-            [InlineKeyboardButton("🏃‍♂️ Early Check Out", callback_data="early_check_out")],
-            [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")],
-        ]
-    )
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    message.reply_text("✍️ **Please Choose An Action:**", reply_markup=reply_markup)
+    await show_screen(message, "✍️ **Please Choose An Action:**", reply_markup=get_submit_menu_keyboard(role))
 
 # Guides
-def show_sentosa_guide(client, message):
+async def show_sentosa_guide(client, message):
     """Display the Sentosa Guide menu."""
-    keyboard = InlineKeyboardMarkup(
-        [
-            [InlineKeyboardButton("🗺️ Fort Siloso Map", callback_data="fort_siloso_map")],
-            [
-                InlineKeyboardButton(
-                    "📍Directions to Fort Siloso", callback_data="fort_siloso"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    "📍 Directions to Madame Tussauds", callback_data="madame_tussauds"
-                )
-            ],
-            [InlineKeyboardButton("📍 Directions to SOSS/CIS", callback_data="soss_cis")],
+    await show_screen(message, "**☀️ Sentosa Guide**", reply_markup=SENTOSA_GUIDE_KEYBOARD)
 
-            [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")],
-        ]
-    )
-    message.reply_text("**☀️ Sentosa Guide**", reply_markup=keyboard)
-
-def handle_sentosa_location_request(callback_query, action):
+async def handle_sentosa_location_request(callback_query, action):
     user_id = callback_query.from_user.id
     user_states[user_id] = action
-    callback_query.message.reply_text(
+    await callback_query.message.reply_text(
         "Please share your location to get directions.",
         reply_markup=ReplyKeyboardMarkup(
             [
@@ -1135,196 +2481,189 @@ def handle_sentosa_location_request(callback_query, action):
         ),
     )
 
-def handle_fort_siloso_map_request(client, callback_query):
-    loading_message = callback_query.message.reply_text("Retrieving... please wait.")
+async def handle_fort_siloso_map_request(client, callback_query):
+    loading_message = await callback_query.message.reply_text("Retrieving... please wait.")
     try:
-        with open("misc/Fort Siloso Map.pdf", "rb") as pdf:
-            keyboard = InlineKeyboardMarkup(
-                [
-                    [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]
-                ]
-            )
-            callback_query.message.reply_document(
-                pdf,
-                file_name="Fort Siloso Map.pdf", reply_markup=keyboard  # Specify the desired file name here
-            )
-        loading_message.delete()
+        keyboard = InlineKeyboardMarkup(
+            [
+                [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]
+            ]
+        )
+        await reply_cached_document(
+            callback_query.message,
+            "misc/Fort Siloso Map.pdf",
+            file_name="Fort Siloso Map.pdf", reply_markup=keyboard  # Specify the desired file name here
+        )
+        await loading_message.delete()
     except FileNotFoundError:
-        loading_message.edit_text("❌ Fort Siloso Map not found.")
+        await loading_message.edit_text("❌ Fort Siloso Map not found.")
 
 
-def show_food_in_smu(client, message):
+async def show_food_in_smu(client, message):
     """Display the Food in SMU menu option."""
-    keyboard = InlineKeyboardMarkup(
-        [
-            [
-                InlineKeyboardButton(
-                    "🍽 Food in SMU",
-                    url="https://www.smu.edu.sg/campus-life/visiting-smu/food-beverages-listing",
-                )
-            ],
-            [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]
-        ]
-    )
-    message.reply_text("🍽 **Food in SMU**", reply_markup=keyboard)
+    await show_screen(message, "🍽 **Food in SMU**", reply_markup=FOOD_IN_SMU_KEYBOARD)
 
-def handle_view_campus_map(callback_query):
+async def handle_view_campus_map(callback_query):
     """Handle the callback query to view the campus map."""
-    loading_message = callback_query.message.reply_text("Retrieving campus map, please wait...")
+    loading_message = await callback_query.message.reply_text("Retrieving campus map, please wait...")
 
     try:
-        with open("misc/campus map.jpg", "rb") as photo:
-            keyboard = InlineKeyboardMarkup(
-                [
-                    [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]
-                ]
-            )
-            loading_message.delete()
-            callback_query.message.reply_photo(photo, caption="🏫 **Campus Map** 🏫", reply_markup=keyboard)
+        keyboard = InlineKeyboardMarkup(
+            [
+                [InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]
+            ]
+        )
+        await reply_cached_photo(callback_query.message, "misc/campus map.jpg", caption="🏫 **Campus Map** 🏫", reply_markup=keyboard)
+        await loading_message.delete()
     except FileNotFoundError:
-        loading_message.edit_text("❌ Campus map image not found.")
+        await loading_message.edit_text("❌ Campus map image not found.")
 
 # Contacts
-def show_positions(client, message):
+async def show_positions(client, message):
     """Display the list of positions available to contact."""
-    positions = ["Co-chair", "HR", "Programmes", "Operations", "Logistics"]
-    keyboard = InlineKeyboardMarkup(
-        [
-            [InlineKeyboardButton(position, callback_data=f"position_{position}")]
-            for position in positions
-        ]
-        + [[InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]]
-    )
-    message.reply_text("📞 **Choose A Position To Contact:**", reply_markup=keyboard)
-
-def get_contact_info(position):
-    """Fetch and return contact information for the given position."""
-    contact_sheet = client.open("Important Contacts").sheet1  # Adjust if necessary
-    records = contact_sheet.get_all_records()
-
-    contacts = [
-        f"{record['Name']} ({record['Position']}): {record['Telegram']}"
-        for record in records
-        if record["Position"] == position
-    ]
+    await show_screen(message, "📞 **Choose A Position To Contact:**", reply_markup=POSITIONS_KEYBOARD)
+
+def build_contacts_directory():
+    """Download the contacts sheet once and render the message for every position."""
+    # The first worksheet is sheet1; the cached handle keeps the read rate limited and timed
+    contacts_sheet = next(iter(open_spreadsheet("contacts")[1].values()))
+    records = contacts_sheet.get_all_records()
+    lines_by_position = defaultdict(list)
+    for record in records:
+        lines_by_position[record["Position"]].append(
+            f"{record['Name']} ({record['Position']}): {record['Telegram']}"
+        )
+    return {
+        position: f"📞 **Contacts for {position}**:\n\n" + "\n".join(lines)
+        for position, lines in lines_by_position.items()
+    }
 
-    if contacts:
-        return "\n".join(contacts)
-    else:
-        return "No contacts found for this position."
+def get_contacts_directory():
+    """Return position -> rendered contacts, rebuilt only after the contacts sheet is edited."""
+    return get_cached_sheet_data("contacts", "contacts", build_contacts_directory)
 
-def handle_view_contact(callback_query, data):
+async def handle_view_contact(callback_query, data):
     position = data[len("position_") :]
-    loading_message = callback_query.message.reply("Retrieving contacts, please wait...")
-    contact_info = get_contact_info(position)
-    if contact_info:
-        loading_message.edit_text(
-            f"📞 **Contacts for {position}**:\n\n{contact_info}",
-            reply_markup=InlineKeyboardMarkup(
-                [
-                    [InlineKeyboardButton("🔙 Back to Contact List", callback_data="contact_person")]
-                ]
-            ),
-        )
-    else:
-        loading_message.edit_text(
-            "No contacts found!",
-            reply_markup=InlineKeyboardMarkup(
-                [InlineKeyboardButton("🔙 Back to Contact List", callback_data="contact_person")]
-            ),
-        )
+    # The directory is warmed at startup and kept fresh in the background, so this is normally a dict lookup
+    directory = await run_sheets(get_contacts_directory)
+    await show_screen(
+        callback_query.message,
+        directory.get(position, f"📞 **Contacts for {position}**:\n\nNo contacts found for this position."),
+        reply_markup=BACK_TO_CONTACTS_KEYBOARD,
+    )
 
 # Camp Strength
-def get_strength_summary():
-    """Retrieve the present and total strength for each subclan from the Camp Strength sheet."""
+CLANS = ["DURIO", "ORCHIDIUM", "MERLIOSA", "QUILAPIUS"]
+STAFF_SUBCLANS = ["OC", "GM", "CH", "MC"]
+
+# Present and total counts per subclan, kept in the state database so every worker sees the writer's changes
+with state_db_lock:
+    state_db.execute(
+        "CREATE TABLE IF NOT EXISTS camp_strength ("
+        "subclan TEXT PRIMARY KEY, present INTEGER NOT NULL, total INTEGER NOT NULL, section TEXT)"
+    )
+    state_db.commit()
+camp_strength_seeded = False  # Whether this process has seeded the counts, replacing those of an earlier run
+
+def strength_section(subclan):
+    """Return the summary section for a subclan: a staff group, or the clan sharing its first letter."""
+    if subclan in STAFF_SUBCLANS:
+        return subclan
+    for clan in CLANS:
+        if subclan.startswith(clan[0]):
+            return clan
+    return None
+
+def refresh_camp_strength():
+    """Re-seed the strength counts from the Camp Strength sheet, replacing any local drift."""
+    global camp_strength_seeded
     expected_headers = ["Subclan", "Present", "Total"]
-    strength_data = total_strength_sheet.get_all_records(expected_headers=expected_headers)
-    strength_summary = {record["Subclan"]: f"{record['Present']} / {record['Total']}" for record in strength_data}
-    return strength_summary
-
-def handle_show_strength(callback_query):
-    """Handle the callback query to show subclan strength."""
-    strength_summary = get_strength_summary()
-    subclan_sections = {
-        "OC": [],
-        "GM": [],
-        "CH": [],
-        "DURIO": [],
-        "ORCHIDIUM": [],
-        "MERLIOSA": [],
-        "QUILAPIUS": [],
-        "MC": [],
-    }
-
-    clan_totals = {
-        "DURIO": {"present": 0, "total": 0},
-        "ORCHIDIUM": {"present": 0, "total": 0},
-        "MERLIOSA": {"present": 0, "total": 0},
-        "QUILAPIUS": {"present": 0, "total": 0},
+    strength_data = get_worksheet("total_strength").get_all_records(expected_headers=expected_headers)
+    rows = [
+        (record["Subclan"], int(record["Present"]), int(record["Total"]), strength_section(record["Subclan"]))
+        for record in strength_data
+    ]
+    with state_db_lock:
+        state_db.execute("DELETE FROM camp_strength")
+        state_db.executemany("INSERT INTO camp_strength (subclan, present, total, section) VALUES (?, ?, ?, ?)", rows)
+        state_db.commit()
+    camp_strength_seeded = True
+
+def load_camp_strength():
+    """Return subclan -> {"present", "total", "section"} as last recorded by any worker."""
+    with state_db_lock:
+        rows = state_db.execute("SELECT subclan, present, total, section FROM camp_strength").fetchall()
+    return {
+        subclan: {"present": present, "total": total, "section": section}
+        for subclan, present, total, section in rows
     }
 
-    for subclan, summary in strength_summary.items():
-        present, total = map(int, summary.split(" / "))
+def get_camp_strength():
+    """Return the strength counts, seeding them now if no worker has yet.
+
+    Worker 0 also seeds them on its first call, so counts left by an earlier run are never shown.
+    """
+    strength = load_camp_strength()
+    if not strength or (WORKER_INDEX == 0 and not camp_strength_seeded):
+        refresh_camp_strength()
+        strength = load_camp_strength()
+    return strength
+
+def record_strength_changes(arrived_ids, departed_ids):
+    """Count IDs that just arrived at or returned to camp as present in their subclan, and those who left early as not."""
+    changes = defaultdict(int)
+    for ids, change in ((arrived_ids, 1), (departed_ids, -1)):
+        for id in ids:
+            record = masterlist_by_id.get(id)
+            if record:
+                changes[record.get("SUBCLAN")] += change
+    with state_db_lock:
+        state_db.executemany(
+            "UPDATE camp_strength SET present = present + ? WHERE subclan = ?",
+            [(change, subclan) for subclan, change in changes.items() if change],
+        )
+        state_db.commit()
+
+def render_strength_summary(strength):
+    """Format the strength model as the Subclan Strength Summary message."""
+    subclan_sections = {section: [] for section in STAFF_SUBCLANS + CLANS}
+    clan_totals = {clan: {"present": 0, "total": 0} for clan in CLANS}
+
+    for subclan, counts in strength.items():
+        section = counts["section"]
+        if section is None:
+            continue
+        present, total = counts["present"], counts["total"]
         full_status = " ✅ (FULL) " if present == total else ""
-
-        if subclan == "OC":
-            subclan_sections["OC"].append(f"{subclan}: {summary}{full_status}")
-        if subclan == "MC":
-            subclan_sections["MC"].append(f"{subclan}: {summary}{full_status}")
-        elif subclan == "GM":
-            subclan_sections["GM"].append(f"{subclan}: {summary}{full_status}")
-        elif subclan == "CH":
-            subclan_sections["CH"].append(f"{subclan}: {summary}{full_status}")
-        elif subclan.startswith("D"):
-            subclan_sections["DURIO"].append(f"{subclan}: {summary}{full_status}")
-            clan_totals["DURIO"]["present"] += present
-            clan_totals["DURIO"]["total"] += total
-        elif subclan.startswith("O") and subclan != "OC":
-            subclan_sections["ORCHIDIUM"].append(f"{subclan}: {summary}{full_status}")
-            clan_totals["ORCHIDIUM"]["present"] += present
-            clan_totals["ORCHIDIUM"]["total"] += total
-        elif subclan.startswith("M"):
-            subclan_sections["MERLIOSA"].append(f"{subclan}: {summary}{full_status}")
-            clan_totals["MERLIOSA"]["present"] += present
-            clan_totals["MERLIOSA"]["total"] += total
-        elif subclan.startswith("Q"):
-            subclan_sections["QUILAPIUS"].append(f"{subclan}: {summary}{full_status}")
-            clan_totals["QUILAPIUS"]["present"] += present
-            clan_totals["QUILAPIUS"]["total"] += total
+        subclan_sections[section].append(f"{subclan}: {present} / {total}{full_status}")
+        if section in clan_totals:
+            clan_totals[section]["present"] += present
+            clan_totals[section]["total"] += total
 
     summary_message = "🏆 **Subclan Strength Summary** 🏆\n\n"
     summary_message += "\n".join(subclan_sections["OC"]) + "\n"
     summary_message += "\n".join(subclan_sections["GM"]) + "\n"
     summary_message += "\n".join(subclan_sections["CH"]) + "\n"
     summary_message += "\n".join(subclan_sections["MC"]) + "\n\n"
-
-    summary_message += (
-        f"**DURIO ( {clan_totals['DURIO']['present']} / {clan_totals['DURIO']['total']} )**:\n"
-        + "\n".join(subclan_sections["DURIO"])
-        + "\n\n"
-    )
-    summary_message += (
-        f"**ORCHIDIUM ( {clan_totals['ORCHIDIUM']['present']} / {clan_totals['ORCHIDIUM']['total']} )**:\n"
-        + "\n".join(subclan_sections["ORCHIDIUM"])
-        + "\n\n"
-    )
-    summary_message += (
-        f"**MERLIOSA ( {clan_totals['MERLIOSA']['present']} / {clan_totals['MERLIOSA']['total']} )**:\n"
-        + "\n".join(subclan_sections["MERLIOSA"])
-        + "\n\n"
-    )
-    summary_message += (
-        f"**QUILAPIUS ( {clan_totals['QUILAPIUS']['present']} / {clan_totals['QUILAPIUS']['total']} )**:\n"
-        + "\n".join(subclan_sections["QUILAPIUS"])
+    summary_message += "\n\n".join(
+        f"**{clan} ( {clan_totals[clan]['present']} / {clan_totals[clan]['total']} )**:\n"
+        + "\n".join(subclan_sections[clan])
+        for clan in CLANS
     )
+    return summary_message
+
+async def handle_show_strength(callback_query):
+    """Handle the callback query to show subclan strength."""
+    strength = await run_sheets(get_camp_strength)
+    summary_message = render_strength_summary(strength)
 
     keyboard = InlineKeyboardMarkup(
         [[InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]]
     )
 
-    callback_query.message.reply_text(summary_message, reply_markup=keyboard)
+    await show_screen(callback_query.message, summary_message, reply_markup=keyboard)
 
-def handle_submit_action(callback_query, data):
+async def handle_submit_action(callback_query, data):
     user_id = callback_query.from_user.id
     session_data = user_sessions[user_id]
     role = session_data.get("role")
@@ -1332,9 +2671,12 @@ def handle_submit_action(callback_query, data):
     # clear_user_state(user_id)  # Clear previous actions before setting the new state
 
     user_states[user_id] = data
+    # OCs can send a whole file instead of typing the IDs
+    import_hint = IMPORT_HINTS[data] if role in IMPORT_ROLES else ""
     if data == "early_check_out":
-        callback_query.message.reply_text(
-            "🔸 Please send the details in the format:\n**User ID + Expected Return Date and Time + Reason**. (Input 'Not coming back' for expected return if participant is not coming back).\n\nExample: 0XXXXXXX, 12/8 5:30 PM, Tuition",
+        await callback_query.message.reply_text(
+            "🔸 Please send the details in the format:\n**User ID + Expected Return Date and Time + Reason**. (Input 'Not coming back' for expected return if participant is not coming back).\n\nExample: 0XXXXXXX, 12/8 5:30 PM, Tuition"
+            + import_hint,
             reply_markup=InlineKeyboardMarkup(
                 [
                     [
@@ -1344,9 +2686,10 @@ def handle_submit_action(callback_query, data):
             ),
         )
     elif data == "registration":
-        if role in ["OC", "Game Master"]:
-            callback_query.message.reply_text(
-                "🔸 Please send a list of IDs (8 digits long, starting with 0) separated by spaces for registration of multiple IDs.",
+        if role in REGISTRATION_ROLES:
+            await callback_query.message.reply_text(
+                "🔸 Please send a list of IDs (8 digits long, starting with 0) separated by spaces for registration of multiple IDs."
+                + import_hint,
                 reply_markup=InlineKeyboardMarkup(
                     [
                         [
@@ -1356,7 +2699,7 @@ def handle_submit_action(callback_query, data):
                 ),
             )
         else:
-            callback_query.message.reply_text(
+            await callback_query.message.reply_text(
                 "❌ You do not have permission to register users.",
                 reply_markup=InlineKeyboardMarkup(
                     [
@@ -1367,8 +2710,9 @@ def handle_submit_action(callback_query, data):
                 ),
             )
     else:
-        callback_query.message.reply_text(
-            f"🔸 Please send a list of IDs (8 digits long, starting with 0) separated by spaces for {data.replace('_', ' ')} of multiple IDs.",
+        await callback_query.message.reply_text(
+            f"🔸 Please send a list of IDs (8 digits long, starting with 0) separated by spaces for {data.replace('_', ' ')} of multiple IDs."
+            + import_hint,
             reply_markup=InlineKeyboardMarkup(
                 [
                     [
@@ -1380,14 +2724,14 @@ def handle_submit_action(callback_query, data):
 
 # Command Handlers
 @app.on_message(filters.command("start"))
-def start(client, message):
+async def start(client, message):
     user_id = message.from_user.id
     if user_id in user_sessions:
         del user_sessions[user_id]
-    show_login_menu(client, message)
+    await show_login_menu(client, message)
 
 @app.on_message(filters.command("main_menu"))
-def show_main_menu_command(client, message):
+async def show_main_menu_command(client, message):
     user_id = message.from_user.id
     
     # Check if the user is already in a session
@@ -1397,49 +2741,573 @@ def show_main_menu_command(client, message):
         subclan = session_data.get("subclan")
 
         # User is validated, show the main menu
-        show_menu(client, message)
+        await show_menu(client, message)
     else:
         # User is not validated, ask them to log in with /start
-        message.reply_text(
+        await message.reply_text(
             "❌ Access denied. Please login by pressing /start to continue."
         )
 
-@app.on_callback_query()
-def handle_callback_query(client, callback_query):
-    data = callback_query.data
+@app.on_message(filters.command("refresh_scores"))
+async def refresh_scores_command(client, message):
+    """Let an OC reload the scoreboard right after a round instead of waiting for the next refresh."""
+    session_data = user_sessions.get(message.from_user.id)
+    if not session_data or session_data.get("role") != "OC":
+        await message.reply_text("❌ Only OCs can refresh the scoreboard.")
+        return
 
-    # Answer the callback query to remove the highlight
-    callback_query.answer()
+    try:
+        await run_sheets(refresh_scoreboard)
+    except Exception as e:
+        print(f"Error refreshing scoreboard: {e}")
+        await message.reply_text("❌ Could not refresh the scoreboard. Please try again.")
+        return
+    await message.reply_text("✅ Scoreboard refreshed.")
 
-    user_id = callback_query.from_user.id
-    user_username = callback_query.from_user.username
+def render_stats_summary():
+    """Summarise the slowest handlers and the Sheets traffic for the /stats command."""
+    with metrics_lock:
+        handlers = sorted(
+            handler_latency.items(), key=lambda item: (item[1].quantile(0.95), item[1].sum), reverse=True
+        )
+        handler_lines = [
+            f"{name}: p95 ≤{histogram.quantile(0.95)}s, avg {histogram.sum / histogram.count:.2f}s, "
+            f"{histogram.count} calls, {handler_errors.get(name, 0)} errors"
+            for name, histogram in handlers[:10]
+        ]
+        calls_by_target = defaultdict(int)
+        for (service, target, method), calls in api_calls.items():
+            calls_by_target[(service, target)] += calls
+        api_lines = [
+            f"{target} ({service}): {calls} calls"
+            for (service, target), calls in sorted(calls_by_target.items(), key=lambda item: item[1], reverse=True)
+        ]
+        failed_calls = sum(api_errors.values())
+
+    sections = [
+        "📊 **Bot Stats**",
+        f"Sheets calls in the last minute: {sheets_calls_last_minute()} / {SHEETS_QUOTA_PER_MINUTE}",
+        f"Failed API calls: {failed_calls}",
+        f"Attendance waiting to sync: {count_pending_attendance()}",
+        "\n**Slowest handlers**\n" + ("\n".join(handler_lines) or "No traffic yet."),
+        "\n**API calls**\n" + ("\n".join(api_lines) or "No calls yet."),
+    ]
+    return "\n".join(sections)
+
+@app.on_message(filters.command("stats"))
+async def stats_command(client, message):
+    """Show OCs which handlers are slow and how close the bot is to the Sheets quota."""
+    session_data = user_sessions.get(message.from_user.id)
+    if not session_data or session_data.get("role") != "OC":
+        await message.reply_text("❌ Only OCs can view bot stats.")
+        return
+    await message.reply_text(render_stats_summary())
+
+# Broadcasts
+with state_db_lock:
+    state_db.execute(
+        "CREATE TABLE IF NOT EXISTS broadcasts ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, chat_id INTEGER NOT NULL, target TEXT NOT NULL, "
+        "text TEXT NOT NULL, created_at REAL NOT NULL, status TEXT NOT NULL DEFAULT 'sending')"
+    )
+    state_db.execute(
+        "CREATE TABLE IF NOT EXISTS broadcast_recipients ("
+        "broadcast_id INTEGER NOT NULL, user_id INTEGER NOT NULL, status TEXT NOT NULL DEFAULT 'pending', "
+        "PRIMARY KEY (broadcast_id, user_id))"
+    )
+    state_db.commit()
 
-    clear_user_state(user_id)
+BROADCAST_USAGE = (
+    "📣 Usage: /broadcast <target> <message>\n\n"
+    "Targets: all, role:<Role>, clan:<Clan>, subclan:<Subclan>\n"
+    "Example: /broadcast clan:DURIO Gather at the lawn in 10 minutes!"
+)
 
-    def default_handler():
-        if user_id not in user_sessions:
-            callback_query.message.reply_text(
-                "❌ Access denied. Please login by pressing /start to continue."
-            )
-        else:
-            handle_allowed_user(client, callback_query, data)
+def parse_broadcast_target(target):
+    """Return a filter over session data for "all", "role:X", "clan:X" or "subclan:X", or None if unknown."""
+    if target.lower() == "all":
+        return lambda session: True
+    kind, _, value = target.partition(":")
+    kind = kind.lower()
+    if kind == "role" and value:
+        return lambda session: (session.get("role") or "").lower() == value.lower()
+    if kind == "clan" and value.upper() in CLANS:
+        return lambda session: strength_section(session.get("subclan") or "") == value.upper()
+    if kind == "subclan" and value:
+        return lambda session: (session.get("subclan") or "").upper() == value.upper()
+    return None
+
+def find_broadcast_recipients(matches):
+    """Return the user IDs of everyone logged in whose session matches."""
+    recipients = []
+    for user_id in user_sessions:
+        session = user_sessions.get(user_id)
+        if session and matches(session):
+            recipients.append(user_id)
+    return recipients
+
+def create_broadcast(chat_id, target, text, recipients):
+    """Record a broadcast and its recipients, so a restart can finish sending it."""
+    with state_db_lock:
+        cursor = state_db.execute(
+            "INSERT INTO broadcasts (chat_id, target, text, created_at) VALUES (?, ?, ?, ?)",
+            (chat_id, target, text, time.time()),
+        )
+        state_db.executemany(
+            "INSERT INTO broadcast_recipients (broadcast_id, user_id) VALUES (?, ?)",
+            [(cursor.lastrowid, user_id) for user_id in recipients],
+        )
+        state_db.commit()
+    return cursor.lastrowid
+
+def load_broadcast(broadcast_id):
+    """Return (chat_id, target, text, recipient statuses) for a broadcast."""
+    with state_db_lock:
+        chat_id, target, text = state_db.execute(
+            "SELECT chat_id, target, text FROM broadcasts WHERE id = ?", (broadcast_id,)
+        ).fetchone()
+        statuses = dict(
+            state_db.execute(
+                "SELECT user_id, status FROM broadcast_recipients WHERE broadcast_id = ?", (broadcast_id,)
+            ).fetchall()
+        )
+    return chat_id, target, text, statuses
 
-    handlers = {
-        "login": lambda: handle_login(callback_query, user_username),
-        "login_menu": lambda: show_login_menu(client, callback_query.message),
-        "clans": lambda: show_clans_menu(client, callback_query.message),
-        "exit": lambda: handle_logout(callback_query),
-    }
+def record_broadcast_delivery(broadcast_id, user_id, status):
+    with state_db_lock:
+        state_db.execute(
+            "UPDATE broadcast_recipients SET status = ? WHERE broadcast_id = ? AND user_id = ?",
+            (status, broadcast_id, user_id),
+        )
+        state_db.commit()
+
+def finish_broadcast(broadcast_id):
+    with state_db_lock:
+        state_db.execute("UPDATE broadcasts SET status = 'done' WHERE id = ?", (broadcast_id,))
+        state_db.commit()
+
+def unfinished_broadcasts():
+    with state_db_lock:
+        return [row[0] for row in state_db.execute("SELECT id FROM broadcasts WHERE status = 'sending' ORDER BY id")]
+
+def render_broadcast_progress(target, statuses):
+    sent = sum(1 for status in statuses.values() if status == "sent")
+    failed = sum(1 for status in statuses.values() if status == "failed")
+    pending = len(statuses) - sent - failed
+    state = "📣 Broadcasting" if pending else "✅ Broadcast finished"
+    return f"{state} to {target}: {sent} / {len(statuses)} sent, {failed} failed, {pending} pending."
+
+async def run_broadcast(broadcast_id, progress_message=None):
+    """Deliver a broadcast to every recipient not yet reached, then report the totals.
+
+    BROADCAST_WORKERS messages are in flight at most. A FloodWait pauses every worker for
+    the time Telegram asks, after which the message is retried; any other error marks that
+    recipient failed and the broadcast carries on. Each delivery is recorded
+    as it happens, so a broadcast interrupted by a restart resumes where it stopped.
+    """
+    chat_id, target, text, statuses = await run_blocking(load_broadcast, broadcast_id)
+    pending = asyncio.Queue()
+    for user_id, status in statuses.items():
+        if status == "pending":
+            pending.put_nowait(user_id)
+    resume_at = 0  # Loop time before which no worker may send, after a FloodWait
+
+    async def worker():
+        nonlocal resume_at
+        while True:
+            try:
+                user_id = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            while True:
+                delay = resume_at - asyncio.get_running_loop().time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                try:
+                    await app.send_message(user_id, text)
+                    statuses[user_id] = "sent"
+                except FloodWait as e:
+                    resume_at = max(resume_at, asyncio.get_running_loop().time() + e.value)
+                    continue
+                except Exception as e:
+                    # Dropped connections and timeouts fail this recipient, not the whole broadcast
+                    print(f"Error broadcasting to {user_id}: {e}")
+                    statuses[user_id] = "failed"
+                break
+            await run_blocking(record_broadcast_delivery, broadcast_id, user_id, statuses[user_id])
+
+    async def report_progress():
+        while True:
+            await asyncio.sleep(BROADCAST_PROGRESS_INTERVAL)
+            try:
+                await progress_message.edit_text(render_broadcast_progress(target, statuses))
+            except RPCError as e:
+                print(f"Error updating broadcast progress: {e}")
+
+    if progress_message is None:
+        progress_message = await app.send_message(chat_id, render_broadcast_progress(target, statuses))
+    reporter = asyncio.create_task(report_progress())
+    try:
+        results = await asyncio.gather(*(worker() for _ in range(BROADCAST_WORKERS)), return_exceptions=True)
+    finally:
+        reporter.cancel()
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"Error in broadcast {broadcast_id} worker: {result}")
+    await run_blocking(finish_broadcast, broadcast_id)
+    try:
+        await progress_message.edit_text(render_broadcast_progress(target, statuses))
+    except RPCError as e:
+        # MessageNotModified when the last progress edit already showed the final totals
+        print(f"Error updating broadcast progress: {e}")
+
+broadcast_tasks = set()  # Keeps running broadcasts referenced until they finish
+
+def start_broadcast(broadcast_id, progress_message=None):
+    task = asyncio.create_task(run_broadcast(broadcast_id, progress_message))
+    broadcast_tasks.add(task)
+    task.add_done_callback(broadcast_tasks.discard)
+
+def resume_broadcasts():
+    """Restart the delivery of every broadcast a previous run did not finish."""
+    for broadcast_id in unfinished_broadcasts():
+        print(f"Resuming broadcast {broadcast_id}")
+        start_broadcast(broadcast_id)
+
+@app.on_message(filters.command("broadcast"))
+async def broadcast_command(client, message):
+    """Let an OC send an announcement to everyone logged in, or to one role, clan or subclan."""
+    session_data = user_sessions.get(message.from_user.id)
+    if not session_data or session_data.get("role") not in BROADCAST_ROLES:
+        await message.reply_text("❌ Only OCs can send broadcasts.")
+        return
 
-    if data.startswith("clan_"):
-        clan = data[len("clan_") :]
-        handle_clan_selection(callback_query, clan)
+    parts = message.text.split(None, 2)
+    matches = parse_broadcast_target(parts[1]) if len(parts) == 3 else None
+    if matches is None:
+        await message.reply_text(BROADCAST_USAGE)
+        return
+    target, text = parts[1], parts[2]
+
+    recipients = find_broadcast_recipients(matches)
+    if not recipients:
+        await message.reply_text(f"❌ Nobody matching {target} is logged in.")
+        return
+    broadcast_id = await run_blocking(create_broadcast, message.chat.id, target, text, recipients)
+    progress_message = await message.reply_text(f"📣 Broadcasting to {len(recipients)} user(s) in {target}...")
+    # Delivery carries on in the background so the OC can keep using the bot
+    start_broadcast(broadcast_id, progress_message)
+
+# Inline Queries
+INLINE_POINTS_WORDS = {"points", "point", "pts"}
+INLINE_CREDITS_WORDS = {"credits", "credit", "currency"}
+INLINE_SCHEDULE_WORDS = {"schedule", "schedules"}
+INLINE_CONTACT_WORDS = {"contact", "contacts"}
+INLINE_KEYWORDS = INLINE_POINTS_WORDS | INLINE_CREDITS_WORDS | INLINE_SCHEDULE_WORDS | INLINE_CONTACT_WORDS
+
+def inline_article(result_id, title, text, description=None):
+    return InlineQueryResultArticle(
+        title=title, input_message_content=InputTextMessageContent(text), id=result_id, description=description
+    )
+
+def parse_inline_query(query):
+    """Split an inline query into (kind, day number or None, remaining words).
+
+    A day is picked with "day 3" or "day3". "d3" is left as a word, since D1 to D6 are subclans.
+    """
+    words = query.lower().split()
+    word_set = set(words)
+    if word_set & INLINE_SCHEDULE_WORDS:
+        kind = "schedule"
+    elif word_set & INLINE_CREDITS_WORDS:
+        kind = "credits"
+    elif word_set & INLINE_POINTS_WORDS:
+        kind = "points"
+    elif word_set & INLINE_CONTACT_WORDS:
+        kind = "contacts"
     else:
-        handler = handlers.get(data, default_handler)
-        handler()
+        kind = None
+
+    day = None
+    rest = []
+    for index, word in enumerate(words):
+        if word.startswith("day") and word[3:].isdigit():
+            day = int(word[3:])
+        elif word.isdigit() and index and words[index - 1] == "day":
+            day = int(word)
+        elif word == "day" or word in INLINE_KEYWORDS:
+            continue
+        else:
+            rest.append(word)
+    return kind, day, rest
+
+def build_score_results(kind, subclans):
+    """Articles with the cumulative points or Day 3 credits of each subclan in the snapshot."""
+    snapshot = get_scoreboard()
+    results = []
+    for subclan in subclans:
+        points, credits = snapshot.get(subclan, (None, None))
+        if kind == "points" and points:
+            results.append(inline_article(f"points:{subclan}", f"🏆 {subclan}: {points} points", f"🏆 {subclan} has {points} points."))
+        elif kind == "credits" and credits:
+            results.append(inline_article(f"credits:{subclan}", f"📊 {subclan}: {credits} Day 3 credits", f"📊 {subclan} has {credits} credits for Day 3."))
+    return results
+
+def build_schedule_results(subclans, day):
+    messages = schedule_index["messages"]
+    return [
+        inline_article(f"schedule:{subclan}:{schedule_day}", f"📅 {subclan} {schedule_day}", messages[(subclan, schedule_day)])
+        for subclan in subclans
+        for schedule_day in schedule_index["days"]
+        if (day is None or schedule_day == f"Day {day}") and (subclan, schedule_day) in messages
+    ]
+
+def build_subclan_results(subclans):
+    """Points, Day 3 credits and every day's schedule for each subclan."""
+    return build_score_results("points", subclans) + build_score_results("credits", subclans) + build_schedule_results(subclans, None)
+
+def build_contact_results(words):
+    directory = get_contacts_directory()
+    wanted = " ".join(words)
+    return [
+        inline_article(f"contacts:{position}", f"📞 {position}", text, "Important Contacts")
+        for position, text in directory.items()
+        if wanted in position.lower()
+    ]
+
+def build_inline_results(query, session):
+    """Answer an inline query from the cached scoreboard, schedules and contacts directory.
+
+    Facilitators only see their own subclan, as in the menus; other roles can name any
+    subclan, or leave it out to list them all. A query that only names subclans offers
+    everything about them.
+    """
+    kind, day, words = parse_inline_query(query)
+    role = session.get("role")
+    if kind in ("points", "credits", "schedule") and role not in POINTS_ROLES:
+        return []
+
+    if kind in ("points", "credits", "schedule"):
+        if kind == "schedule":
+            known = sorted({subclan for subclan, _ in schedule_index["messages"]})
+        else:
+            get_scoreboard()
+            known = scoreboard_subclans
+        if role == "Facilitator":
+            subclans = [session.get("subclan")]
+        else:
+            named = [word.upper() for word in words if word.upper() in known]
+            subclans = named or [subclan for subclan in known if not words or any(word.upper() in subclan for word in words)]
+        if kind == "schedule":
+            return build_schedule_results(subclans, day)
+        return build_score_results(kind, subclans)
+    if kind is None and words and role in POINTS_ROLES:
+        get_scoreboard()
+        named = [word.upper() for word in words if word.upper() in scoreboard_subclans]
+        if role == "Facilitator":
+            named = [subclan for subclan in named if subclan == session.get("subclan")]
+        if named:
+            return build_subclan_results(named)
+    if kind == "contacts" or words:
+        return build_contact_results(words)
+
+    # An empty query offers the usual lookups for the user's own subclan and every contact
+    results = []
+    if role in POINTS_ROLES and session.get("subclan"):
+        results += build_subclan_results([session.get("subclan")])
+    return results + build_contact_results([])
+
+async def answer_inline_query(inline_query, session):
+    try:
+        results = await run_sheets(build_inline_results, inline_query.query, session)
+    except SHEETS_ERRORS as e:
+        print(f"Error answering inline query {inline_query.query!r}: {e}")
+        results = []
+    # Results depend on the user's role and subclan, so Telegram must cache them per user
+    await inline_query.answer(results[:INLINE_MAX_RESULTS], cache_time=INLINE_CACHE_TIME, is_personal=True)
+
+@app.on_inline_query()
+async def handle_inline_query(client, inline_query):
+    session = user_sessions.get(inline_query.from_user.id)
+    if not session:
+        await inline_query.answer(
+            [], cache_time=0, is_personal=True, switch_pm_text="Log in to use inline search", switch_pm_parameter="login"
+        )
+        return
+    kind, _, _ = parse_inline_query(inline_query.query)
+    await timed_handler(f"inline:{kind or 'any'}", answer_inline_query, inline_query, session)
+
+# Worker Sharding
+def in_this_worker(user_id):
+    return user_id % WORKER_COUNT == WORKER_INDEX
+
+if WORKER_COUNT > 1:
+    # Every worker receives every update; each answers only its own share of users
+    @app.on_message(group=-1)
+    async def skip_other_workers_messages(client, message):
+        if not message.from_user or not in_this_worker(message.from_user.id):
+            message.stop_propagation()
+
+    @app.on_callback_query(group=-1)
+    async def skip_other_workers_callbacks(client, callback_query):
+        if not in_this_worker(callback_query.from_user.id):
+            callback_query.stop_propagation()
+
+    @app.on_inline_query(group=-1)
+    async def skip_other_workers_inline_queries(client, inline_query):
+        if not in_this_worker(inline_query.from_user.id):
+            inline_query.stop_propagation()
+
+# Callback Routing
+class CallbackRouter:
+    """Dispatch callback data to handlers registered once at import.
+
+    Exact routes are a dict lookup and prefix routes a character trie walk, so dispatch cost
+    depends on the length of the callback data, not on how many routes exist. The longest
+    matching prefix wins. Every route is wrapped in the same middleware: session check,
+    role check, latency recording and Sheets error reporting.
+    """
+
+    def __init__(self):
+        self.exact = {}
+        self.trie = {}
+
+    def route(self, data, handler, roles=None, public=False):
+        """Register handler(client, callback_query, session, data) for callback data equal to data."""
+        self.exact[data] = (data, handler, roles, public)
+
+    def prefix(self, prefix, handler, roles=None, public=False):
+        """Register handler(client, callback_query, session, data) for callback data starting with prefix."""
+        node = self.trie
+        for char in prefix:
+            node = node.setdefault(char, {})
+        # One metrics series per prefix, not per booking or club
+        node[None] = (f"{prefix}*", handler, roles, public)
+
+    def resolve(self, data):
+        route = self.exact.get(data)
+        if route is not None:
+            return route
+        node = self.trie
+        for char in data:
+            node = node.get(char)
+            if node is None:
+                break
+            route = node.get(None, route)
+        return route
+
+    async def dispatch(self, client, callback_query):
+        data = callback_query.data
+        route = self.resolve(data)
+        if route is None:
+            await callback_query.message.reply_text("❌ Invalid option. Press /start to log in.")
+            return
+        name, handler, roles, public = route
+
+        session = user_sessions.get(callback_query.from_user.id)
+        if not public:
+            if session is None:
+                await callback_query.message.reply_text("❌ Access denied. Please login by pressing /start to continue.")
+                return
+            if roles is not None and session.get("role") not in roles:
+                await callback_query.message.reply_text("❌ You do not have access to this option.")
+                return
+
+        if EDIT_IN_PLACE:
+            navigation_message.set(callback_query.message)
+        try:
+            await timed_handler(name, handler, client, callback_query, session, data)
+        except SHEETS_ERRORS as e:
+            print(f"Error handling {data}: {e}")
+            await callback_query.message.reply_text(sheets_error_message(e))
+
+callback_router = CallbackRouter()
+
+# Login and navigation, available before logging in
+callback_router.route("login", lambda client, query, session, data: handle_login(query, query.from_user.username), public=True)
+callback_router.route("login_menu", lambda client, query, session, data: show_login_menu(client, query.message), public=True)
+callback_router.route("clans", lambda client, query, session, data: show_clans_menu(client, query.message), public=True)
+callback_router.route("exit", lambda client, query, session, data: handle_logout(query), public=True)
+callback_router.prefix("clan_", lambda client, query, session, data: handle_clan_selection(query, data[len("clan_"):]), public=True)
+
+# Menus open to every logged-in role
+callback_router.route("begin_adventure", lambda client, query, session, data: handle_begin_adventure(query))
+callback_router.route("main_menu", lambda client, query, session, data: show_menu_and_clear_state(client, query.message, query.from_user.id))
+callback_router.route("help", lambda client, query, session, data: query.message.reply_text("ℹ️ Key in /start to get started."))
+callback_router.route("explore_clubs", lambda client, query, session, data: show_club_list(client, query.message))
+callback_router.prefix("club_", lambda client, query, session, data: handle_view_club(query, data))
+callback_router.route("contact_person", lambda client, query, session, data: show_positions(client, query.message))
+callback_router.prefix("position_", lambda client, query, session, data: handle_view_contact(query, data))
+callback_router.route("view_links", lambda client, query, session, data: show_essential_links(client, query.message))
+callback_router.route("view_campus_map", lambda client, query, session, data: handle_view_campus_map(query))
+callback_router.route("food_in_smu", lambda client, query, session, data: show_food_in_smu(client, query.message))
+callback_router.route("sentosa_guide", lambda client, query, session, data: show_sentosa_guide(client, query.message))
+callback_router.route("fort_siloso_map", lambda client, query, session, data: handle_fort_siloso_map_request(client, query))
+for location in ("fort_siloso", "madame_tussauds", "soss_cis"):
+    callback_router.route(location, lambda client, query, session, data: handle_sentosa_location_request(query, data))
+
+# Role-specific options, matching the buttons show_menu offers each role
+callback_router.route("view_bookings", lambda client, query, session, data: handle_view_bookings(client, query), roles=BOOKING_ROLES)
+callback_router.prefix("bk_", lambda client, query, session, data: handle_booking_navigation(query, data), roles=BOOKING_ROLES)
+callback_router.route("show_strength", lambda client, query, session, data: handle_show_strength(query), roles=STRENGTH_ROLES)
+callback_router.route("submit_ids", lambda client, query, session, data: show_submit_menu(client, query.message, session["role"]), roles=ATTENDANCE_ROLES)
+for action in ATTENDANCE_ACTIONS:
+    callback_router.route(action, lambda client, query, session, data: handle_submit_action(query, data), roles=ATTENDANCE_ROLES)
+callback_router.route("view_booklets", lambda client, query, session, data: handle_view_booklets(query), roles=BOOKLET_ROLES)
+callback_router.route("points_matters", lambda client, query, session, data: show_points_matters(client, query.message), roles=POINTS_ROLES)
+callback_router.route(
+    "get_overall_subclan_points",
+    lambda client, query, session, data: handle_get_overall_points(client, query, session["role"], session["subclan"]),
+    roles=POINTS_ROLES,
+)
+callback_router.route(
+    "get_d3_currency",
+    lambda client, query, session, data: handle_get_d3_currency(client, query, session["role"], session["subclan"]),
+    roles=POINTS_ROLES,
+)
+callback_router.route(
+    "view_schedule",
+    lambda client, query, session, data: handle_get_schedule(client, query, session["role"], session["subclan"]),
+    roles=POINTS_ROLES,
+)
+callback_router.prefix(
+    "get_schedule_day ",
+    lambda client, query, session, data: handle_view_day_schedule(query, data.replace("get_schedule_day", "Day")),
+    roles=POINTS_ROLES,
+)
+
+@app.on_callback_query()
+async def handle_callback_query(client, callback_query):
+    # Answer the callback query to remove the highlight
+    await callback_query.answer()
+    clear_user_state(callback_query.from_user.id)
+    await callback_router.dispatch(client, callback_query)
+
+@app.on_message(filters.document)
+async def handle_document_upload(client, message):
+    user_id = message.from_user.id
+    session_data = user_sessions.get(user_id)
+    if not session_data:
+        await message.reply_text("❌ Access denied. Please login by pressing /start to continue.")
+        return
+    if session_data.get("role") not in IMPORT_ROLES:
+        await message.reply_text("❌ Only OCs can import attendance files.")
+        return
+
+    action = user_states.get(user_id)
+    if action not in ATTENDANCE_ACTIONS or (action == "registration" and session_data.get("role") not in REGISTRATION_ROLES):
+        await message.reply_text("🔹 Please choose an attendance action from the menu before uploading a file.")
+        return
+
+    try:
+        await timed_handler(f"upload:{action}", handle_attendance_import, client, message, action)
+    except SHEETS_ERRORS as e:
+        # The input state is kept, so the user can simply upload the file again
+        print(f"Error importing {action}: {e}")
+        await message.reply_text(sheets_error_message(e))
 
 @app.on_message(filters.location)
-def handle_location(client, message):
+async def handle_location(client, message):
     user_location = message.location
     latitude = user_location.latitude
     longitude = user_location.longitude
@@ -1461,32 +3329,32 @@ def handle_location(client, message):
             maps_url = None
 
         if maps_url:
-            message.reply_text(
+            await message.reply_text(
                 f"Here is the direction to your destination:\n{maps_url}",
                 reply_markup=InlineKeyboardMarkup(
                     [[InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]]
                 )
             )
         else:
-            message.reply_text(
+            await message.reply_text(
                 "Location received but no action found.",
                 reply_markup=InlineKeyboardMarkup(
                     [[InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]]
                 )
             )
     else:
-        message.reply_text(
+        await message.reply_text(
             "Location received but no action found.",
             reply_markup=InlineKeyboardMarkup(
                 [[InlineKeyboardButton("🔙 Back to Main Menu", callback_data="main_menu")]]
             )
         )
 @app.on_message(filters.text & filters.create(lambda _, __, msg: not msg.text.startswith("/")))
-def handle_client_input(client, message):
+async def handle_client_input(client, message):
     user_id = message.from_user.id
 
     if user_id not in user_sessions:
-        message.reply_text("❌ Access denied. Please login by pressing /start to continue.")
+        await message.reply_text("❌ Access denied. Please login by pressing /start to continue.")
         return
 
     session_data = user_sessions.get(user_id, {})
@@ -1494,24 +3362,118 @@ def handle_client_input(client, message):
     subclan = session_data.get("subclan")
 
     if user_id not in user_states:
-        message.reply_text("🔹 Please choose an appropriate action from the menu.")
+        await message.reply_text("🔹 Please choose an appropriate action from the menu.")
         return
 
     action = user_states[user_id]
     text = message.text.strip()
-    loading_message = message.reply_text("⏳ Loading... Please wait.")
-
-    if action in ["get_schedule_day 1", "get_schedule_day 3"]:
-        # Schedule retrieval does not require ID validation
-        day = "Day 1" if action == "get_schedule_day 1" else "Day 3"
-        handle_get_schedule_message(loading_message, role, subclan, text, day)
-    elif action == "early_check_out":
-        handle_early_check_out(loading_message, text)
-    elif action == "get_overall_subclan_points":
-        handle_get_overall_subclan_points(loading_message, role, subclan, text)
-    elif action == "get_d3_currency":
-        handle_get_d3_currency_points(loading_message, role, subclan, text)
-    else:
-        handle_default_action(loading_message, text, action, role)
+    loading_message = await message.reply_text("⏳ Loading... Please wait.")
 
-app.run()
+    name = f"input:{action}"
+    try:
+        if action.startswith("get_schedule_day "):
+            # Schedule retrieval does not require ID validation
+            day = action.replace("get_schedule_day", "Day")
+            await timed_handler(name, handle_get_schedule_message, loading_message, role, subclan, text, day)
+        elif action == "early_check_out":
+            await timed_handler(name, handle_early_check_out, loading_message, text)
+        elif action == "get_overall_subclan_points":
+            await timed_handler(name, handle_get_overall_subclan_points, loading_message, role, subclan, text)
+        elif action == "get_d3_currency":
+            await timed_handler(name, handle_get_d3_currency_points, loading_message, role, subclan, text)
+        else:
+            await timed_handler(name, handle_default_action, loading_message, text, action, role)
+    except SHEETS_ERRORS as e:
+        # The input state is kept, so the user can simply send the same message again
+        print(f"Error handling {action}: {e}")
+        await loading_message.edit_text(sheets_error_message(e))
+
+# Startup
+def run_startup_phase(name, func, timings):
+    """Run one warm-up step, recording how long it took and reporting failures without stopping the rest."""
+    started = time.perf_counter()
+    try:
+        func()
+    except Exception as e:
+        print(f"Startup phase {name} failed: {e}")
+    timings[name] = time.perf_counter() - started
+
+def warm_up_data_layers():
+    """Open every spreadsheet and load the caches in parallel, then start the background refreshers."""
+    started = time.perf_counter()
+    timings = {}
+    run_startup_phase("schedules", load_schedules, timings)
+    run_startup_phase("media registry", load_media_registry, timings)
+    run_startup_phase("club cache", load_club_cache, timings)
+
+    phases = {f"open {key}": (lambda key=key: open_spreadsheet(key)) for key in SPREADSHEET_NAMES}
+    phases["masterlist"] = refresh_masterlist_index
+    phases["scoreboard"] = get_scoreboard
+    phases["camp strength"] = get_camp_strength
+    phases["contacts"] = get_contacts_directory
+    phases["registered ids"] = refresh_registered_ids
+    with ThreadPoolExecutor(max_workers=len(phases)) as pool:
+        for name, func in phases.items():
+            pool.submit(run_startup_phase, name, func, timings)
+
+    start_background_refresh("masterlist", refresh_masterlist_index, MASTERLIST_REFRESH_INTERVAL)
+    start_background_refresh("scoreboard", refresh_scoreboard, SCOREBOARD_REFRESH_INTERVAL)
+    if WORKER_INDEX == 0:
+        start_background_refresh("camp strength", refresh_camp_strength, STRENGTH_SYNC_INTERVAL)
+    start_background_refresh("contacts", get_contacts_directory, SHEET_CHANGE_CHECK_INTERVAL)
+    start_background_refresh("schedules", load_schedules, SCHEDULE_RELOAD_INTERVAL)
+    start_background_refresh("sessions", evict_expired_sessions, SESSION_EVICT_INTERVAL)
+    if WORKER_INDEX == 0:
+        threading.Thread(target=prefetch_club_info, name="prefetch-clubs", daemon=True).start()
+        start_background_refresh("clubs", prefetch_club_info, CLUB_REFRESH_INTERVAL)
+    else:
+        # Worker 0 scrapes the clubs and writes the cache file; the others only read it
+        start_background_refresh("clubs", load_club_cache, CLUB_REFRESH_INTERVAL)
+
+    for name, seconds in timings.items():
+        print(f"Startup: {name} took {seconds:.2f}s")
+    print(f"Startup: data layers ready in {time.perf_counter() - started:.2f}s")
+
+async def main():
+    global event_loop
+    event_loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    # Only one process writes to the sheets and resumes broadcasts; the others just journal
+    is_writer = WORKER_INDEX == 0
+    if is_writer:
+        threading.Thread(target=attendance_writer, name="attendance-writer", daemon=True).start()
+    start_metrics_server()
+    if FAST_START:
+        # Answer Telegram straight away and let lookups that arrive early load what they need on demand
+        await app.start()
+        print(f"Startup: connected to Telegram in {time.perf_counter() - started:.2f}s")
+        if is_writer:
+            resume_broadcasts()
+        threading.Thread(target=warm_up_data_layers, name="warm-up", daemon=True).start()
+    else:
+        await run_sheets(warm_up_data_layers)
+        await app.start()
+        print(f"Startup: connected to Telegram in {time.perf_counter() - started:.2f}s")
+        if is_writer:
+            resume_broadcasts()
+    await idle()
+    await app.stop()
+
+def run_workers():
+    """Run WORKER_COUNT copies of the bot, one per share of users, until they all exit."""
+    processes = [
+        subprocess.Popen([sys.executable, *sys.argv], env={**os.environ, "WORKER_INDEX": str(index)})
+        for index in range(WORKER_COUNT)
+    ]
+    try:
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+if __name__ == "__main__":
+    if WORKER_COUNT > 1 and "WORKER_INDEX" not in os.environ:
+        run_workers()
+    else:
+        app.run(main())